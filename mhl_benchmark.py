@@ -0,0 +1,92 @@
+import argparse
+import gzip
+import lzma
+import os
+import shutil
+import tempfile
+import time
+
+import mhl_crosscheck
+
+
+def write_test_mhl(file_path, entries):
+
+    """write a mhl 1.1 file with a number of made up entries, like a camera card offload"""
+
+    with open(file_path, 'w') as file_handler:
+        file_handler.write('<?xml version="1.0" encoding="UTF-8"?>\n<hashlist version="1.1">\n')
+
+        for index in range(entries):
+            file_handler.write(f'  <hash>\n'
+                               f'    <file>A{index // 1000:03d}C{index % 1000:03d}/A{index:07d}.ari</file>\n'
+                               f'    <size>{12_000_000 + index}</size>\n'
+                               f'    <lastmodificationdate>2024-01-01T12:00:00Z</lastmodificationdate>\n'
+                               f'    <xxhash64be>{index:016x}</xxhash64be>\n'
+                               f'    <hashdate>2024-01-01T12:30:00Z</hashdate>\n'
+                               f'  </hash>\n')
+
+        file_handler.write('</hashlist>\n')
+
+
+def compress(file_path, extension, opener):
+
+    compressed_path = file_path + extension
+
+    with open(file_path, 'rb') as source, opener(compressed_path, 'wb') as destination:
+        shutil.copyfileobj(source, destination, 8 * 1024 * 1024)
+
+    return compressed_path
+
+
+def time_parse(file_path, repeats):
+
+    """return the fastest time to parse a mhl, in seconds"""
+
+    best = None
+
+    for _ in range(repeats):
+        start = time.perf_counter()
+        mhl_crosscheck.mhl_to_dict(file_path, add_parent_folders=1)
+        elapsed = time.perf_counter() - start
+
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best
+
+
+def run_benchmark(folder, entries, repeats):
+
+    mhl_path = os.path.join(folder, 'A001R1AB.mhl')
+
+    write_test_mhl(mhl_path, entries)
+
+    mhl_paths = [mhl_path, compress(mhl_path, '.gz', gzip.open), compress(mhl_path, '.xz', lzma.open)]
+
+    text_size = os.path.getsize(mhl_path)
+
+    print(f"{entries} entries, {text_size / 1_000_000:.1f} MB of text")
+
+    for file_path in mhl_paths:
+        file_size = os.path.getsize(file_path)
+        elapsed = time_parse(file_path, repeats)
+
+        print(f"{os.path.basename(file_path):<20} {file_size / 1_000_000:8.1f} MB on disk  "
+              f"{elapsed:6.2f} s  {entries / elapsed:10.0f} entries/s  "
+              f"{file_size / elapsed / 1_000_000:8.1f} MB/s read from disk")
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Compare parsing plain and compressed MHLs")
+    parser.add_argument('--entries', type=int, default=200_000, help="number of entries in the test mhl")
+    parser.add_argument('--folder', help="folder to write the test mhls in, such as a network share. "
+                                         "Defaults to a temporary folder")
+    parser.add_argument('--repeats', type=int, default=3, help="runs of each file, the fastest is shown")
+    args = parser.parse_args()
+
+    if args.folder:
+        run_benchmark(args.folder, args.entries, args.repeats)
+
+    else:
+        with tempfile.TemporaryDirectory() as temporary_folder:
+            run_benchmark(temporary_folder, args.entries, args.repeats)
@@ -0,0 +1,79 @@
+import concurrent.futures
+
+import numpy
+
+
+class ShardedComparison:
+
+    """
+    Compare the source indexes with each backup in a pool of processes. Every entry is reduced to a 64 bit hash of its
+    path and a 64 bit hash of its path and size, and the entries are split into shards by path hash, so each process
+    is only sent the two hash columns of its own shard rather than any dictionaries
+    """
+
+    def __init__(self, source_key_hashes, source_entry_hashes, processes=4):
+
+        self.processes = processes
+        self.source_shards = partition(source_key_hashes, source_entry_hashes, processes)
+
+        self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=processes)
+
+    def compare(self, backup_key_hashes, backup_entry_hashes):
+
+        """return the positions of the source entries missing from a backup, and of those with a different size,
+        both in source order"""
+
+        backup_shards = partition(backup_key_hashes, backup_entry_hashes, self.processes)
+
+        futures = [self.executor.submit(compare_shard, source_keys, source_entries, backup_keys, backup_entries)
+                   for (positions, source_keys, source_entries), (_, backup_keys, backup_entries)
+                   in zip(self.source_shards, backup_shards)]
+
+        missing = []
+        wrong = []
+
+        for (positions, _, _), future in zip(self.source_shards, futures):
+            shard_missing, shard_wrong = future.result()
+
+            missing.append(positions[shard_missing])
+            wrong.append(positions[shard_wrong])
+
+        return numpy.sort(numpy.concatenate(missing)), numpy.sort(numpy.concatenate(wrong))
+
+    def close(self):
+
+        self.executor.shutdown()
+
+
+def partition(key_hashes, entry_hashes, shards):
+
+    """split two hash columns into shards by key hash, returning each shard's original positions and its columns"""
+
+    shard_ids = (key_hashes % numpy.uint64(shards)).astype(numpy.uint16)
+
+    # a stable sort of small integers is a radix sort, so this stays linear
+    order = numpy.argsort(shard_ids, kind='stable')
+    bounds = numpy.searchsorted(shard_ids[order], numpy.arange(shards + 1))
+
+    return [(order[start:end], key_hashes[order[start:end]], entry_hashes[order[start:end]])
+            for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+def compare_shard(source_keys, source_entries, backup_keys, backup_entries):
+
+    """return the indexes of the source entries missing from the backup shard, and of those whose size differs"""
+
+    if not len(backup_keys):
+        return numpy.arange(len(source_keys)), numpy.zeros(0, dtype=numpy.int64)
+
+    order = numpy.argsort(backup_keys)
+    backup_keys = backup_keys[order]
+    backup_entries = backup_entries[order]
+
+    positions = numpy.searchsorted(backup_keys, source_keys)
+    positions[positions == len(backup_keys)] = 0
+
+    found = backup_keys[positions] == source_keys
+    wrong = found & (backup_entries[positions] != source_entries)
+
+    return numpy.flatnonzero(~found), numpy.flatnonzero(wrong)
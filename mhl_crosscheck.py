@@ -1,50 +1,151 @@
+from array import array
+import argparse
+import asyncio
+import bz2
+import codecs
+from collections import OrderedDict
 import csv
+import fnmatch
+import gzip
+import itertools
+import lzma
+import math
 import os
+import pickle
+import queue
+import random
 import re
+import threading
 import time
+import unicodedata
 from datetime import datetime
 import sys
 
+import numpy
+
 import ale
+import mhl_compare
+import mhl_index
+import mhl_rehash
+import mhl_v2
 
 __version__ = '1.1.0'
 
+# mhls can be archived compressed, and are decompressed as they are read
+MHL_EXTENSIONS = ('.mhl', '.mhl.gz', '.mhl.xz', '.mhl.bz2')
+COMPRESSED_OPENERS = {'.gz': gzip.open, '.xz': lzma.open, '.bz2': bz2.open}
+
 
 class IgnoredFiles:
 
-    def __init__(self):
+    """
+    Rules for files to leave out of the checks, one per line: an exact file name, a glob pattern such as ._* or *.tmp,
+    or a regular expression starting with re: - blank lines and lines starting with # are skipped.
+    Names are matched against a set, and all patterns are compiled into one regular expression
+    """
+
+    default_file = 'ignore_files.txt'
+
+    def __init__(self, file_paths=None):
+
         self.ignore_list = []
-        self.load_ignore_list()
+
+        self.names = set()
+        self.pattern = None
+
+        if file_paths is None:
+            self.load_ignore_list()
+        else:
+            for file_path in file_paths:
+                self.add_rules_from_file(file_path)
 
     def load_ignore_list(self):
 
-        ignore_list = []
+        """load the default ignore file, from the working folder or from next to the tool"""
 
-        try:
-            with open('ignore_files.txt', 'r') as ignore_file:
-                for line in ignore_file:
-                    ignore_list.append(line.strip())
-            self.ignore_list = ignore_list
+        for file_path in [self.default_file, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                           self.default_file)]:
+            if os.path.isfile(file_path):
+                self.add_rules_from_file(file_path)
+                return
 
-        except FileNotFoundError:
+        print("{}No ignore file found{}".format(PrintColours.FAIL, PrintColours.ENDC))
+        sys.exit(1)
 
-            print("{}No ignore file found{}".format(PrintColours.FAIL, PrintColours.ENDC))
-            sys.exit(1)
+    def add_rules_from_file(self, file_path):
+
+        with open(file_path, 'r') as ignore_file:
+            self.add_rules(ignore_file)
+
+    def add_rules(self, rules):
+
+        for rule in rules:
+            rule = rule.strip()
+
+            if rule and not rule.startswith('#'):
+                self.ignore_list.append(rule)
+
+        self.compile()
+
+    def compile(self):
+
+        self.names = set()
+        patterns = []
+
+        for rule in self.ignore_list:
+
+            if rule.startswith('re:'):
+                patterns.append(rule[len('re:'):])
+
+            elif any(x in rule for x in '*?['):
+                patterns.append(fnmatch.translate(rule))
+
+            else:
+                self.names.add(rule)
+
+        self.pattern = re.compile('|'.join(f'(?:{x})' for x in patterns)) if patterns else None
+
+    def extended(self, file_paths):
+
+        """return a copy of these rules with the rules from more ignore files added, leaving these rules unchanged"""
+
+        ignored_files = IgnoredFiles(file_paths=[])
+        ignored_files.ignore_list = list(self.ignore_list)
+
+        for file_path in file_paths:
+            ignored_files.add_rules_from_file(file_path)
+
+        ignored_files.compile()
+
+        return ignored_files
+
+    def matches(self, file_name):
+
+        """return True if a file name should be ignored"""
+
+        return file_name in self.names or (self.pattern is not None and self.pattern.fullmatch(file_name) is not None)
 
 
 class BackupChecker:
 
     def __init__(self, root_folder, source_folders=None, backup_pattern="", backup_trim=0,
-                 dual_backups=True, add_roll_folder=1, manager=None, require_ale=False):
+                 dual_backups=True, add_roll_folder=1, manager=None, require_ale=False, mhl_cache=None,
+                 ignore_files=None, on_progress=None, checkpoint=False, resume=False, inventory=None,
+                 read_ahead_depth=4, read_ahead_chunk_size=8 * 1024 * 1024, compare_hashes=False,
+                 deep_verify=False, verify_concurrency=8, verify_per_device=2, verify_mmap=False,
+                 normalise_keys=False, ignore_file="", quick_check=False, quick_sample_size=20000,
+                 lean=False, compare_processes=0, use_index=False):
 
         if not source_folders:
             self.source_folders = ["Camera_Media", "Sound_Media"]
         else:
             self.source_folders = source_folders
 
-        self.logger = Logger(manager=manager)
+        self.logger = Logger(manager=manager, on_progress=on_progress)
         self.error_lock_triggered = False
-        self.ignore_files = IgnoredFiles()
+        self.ignore_files = ignore_files if ignore_files is not None else IgnoredFiles()
+        self.ignore_file = ignore_file
+        self.mhl_cache = mhl_cache if mhl_cache is not None else MhlCache()
 
         self.files_scanned = []
 
@@ -54,14 +155,76 @@ class BackupChecker:
         self.add_parent_folders = add_roll_folder
 
         self.require_ale = require_ale
+        self.compare_hashes = compare_hashes
+        self.source_hashes = compare_hashes or deep_verify
+        self.source_digests = DigestStore() if self.source_hashes else None
+
+        self.normalise_keys = normalise_keys
+        self.source_originals = {}
+
+        if lean and compare_hashes:
+            raise BackupCheckerException("Hashes can't be compared in the low memory mode")
+
+        if use_index and compare_hashes:
+            raise BackupCheckerException("Hashes can't be compared using tape indexes")
+
+        self.use_index = use_index
+
+        self.lean = lean
+        self.source_fingerprints = None
+        self.source_keys = None
+
+        self.compare_processes = compare_processes
+        self.sharded_comparison = None
+
+        self.quick_check = quick_check
+        self.quick_sample_size = quick_sample_size
+        self.quick_results = []
+        self.source_entry_count = 0
+
+        self.deep_verify = deep_verify
+        self.verify_concurrency = verify_concurrency
+        self.verify_per_device = verify_per_device
+        self.verify_mmap = verify_mmap
+
+        self.inventory = inventory if inventory is not None else Inventory(root_folder, self.source_folders)
+        self.ignore_files = self.load_extra_ignore_rules()
+
+        self.read_ahead_depth = read_ahead_depth
+        self.read_ahead_chunk_size = read_ahead_chunk_size
+        self.mhl_reader = None
 
         self.dual_backups = dual_backups
+        self.checkpoint = None
+
+        self.report_writer = self.open_report_writer()
+        self.logger.report_writer = self.report_writer
+
+        try:
+            self.run_checks(checkpoint, resume)
+
+        except BaseException:
+            if self.report_writer:
+                self.report_writer.discard()
+            raise
+
+    def run_checks(self, checkpoint, resume):
+
+        """scan the day folder, compare every backup with the sources, and write the report"""
+
         self.backup_mhls = self.get_backup_mhls()
         self.backup_groups = self.group_mhls()
 
         self.source_mhls = self.get_source_mhls()
         self.delivery_ale = self.get_delivery_ale()
 
+        if self.quick_check:
+            self.run_quick_check()
+            return
+
+        if checkpoint or resume:
+            self.checkpoint = self.open_checkpoint(resume)
+
         self.source_dictionary = self.sources_to_dict()
         self.ale_clips = self.ale_to_clip_list()
 
@@ -70,8 +233,150 @@ class BackupChecker:
         self.check_indexes_vs_scanned()
         self.run_backup_checks()
 
+        if self.deep_verify:
+            self.verify_source_files()
+
         self.write_report_file()
 
+        if self.checkpoint:
+            self.checkpoint.remove()
+
+    def open_report_writer(self):
+
+        """start streaming the report and result lists to the day folder, unless running tests or a quick check"""
+
+        if 'unittest' in sys.modules.keys() or self.quick_check:
+            return None
+
+        try:
+            return ReportWriter(self.root_folder)
+
+        except OSError as error:
+            raise BackupCheckerException(f"Could not write the report to {self.root_folder} - {error}")
+
+    def run_quick_check(self):
+
+        """
+        Give a provisional result from a random sample of the source entries, drawn with a reservoir while streaming
+        the source mhls. Each backup's mhls are then streamed once, and only entries in the sample are kept, so neither
+        the sources nor the backups are loaded into dictionaries
+        """
+
+        sample = self.sample_sources()
+
+        self.logger.start_phase("Quick check", bytes_total=self.inventory.total_size(self.backup_mhls))
+
+        for group in self.backup_groups:
+            self.quick_results.append(self.quick_check_backup(group, sample))
+
+        self.logger.finish_progress()
+
+        for result in self.quick_results:
+            self.report_quick_check(result)
+
+    def sample_sources(self):
+
+        """return a uniform random sample of the source entries as a dictionary of files and file sizes"""
+
+        reservoir = []
+        generator = random.Random()
+
+        self.logger.start_phase("Sampling sources", bytes_total=self.inventory.total_size(self.source_mhls))
+
+        for mhl in self.source_mhls:
+
+            for key, size, original_path in mhl_entries(mhl, add_parent_folders=self.add_parent_folders,
+                                                        normalise_keys=self.normalise_keys):
+
+                if self.ignore_files.matches(os.path.basename(original_path)):
+                    continue
+
+                self.source_entry_count += 1
+
+                if len(reservoir) < self.quick_sample_size:
+                    reservoir.append((key, size, original_path))
+
+                else:
+                    index = generator.randrange(self.source_entry_count)
+
+                    if index < self.quick_sample_size:
+                        reservoir[index] = (key, size, original_path)
+
+            self.logger.advance(bytes_done=self.inventory.signature(mhl)[0], current_file=mhl)
+
+        self.source_originals.update({key: original for key, size, original in reservoir if key != original})
+
+        return {key: size for key, size, original in reservoir}
+
+    def quick_check_backup(self, backup_mhls, sample):
+
+        """stream a group of backup mhls, and check each sampled source entry is in them with the same size"""
+
+        backup_sizes = {}
+
+        for mhl in backup_mhls:
+
+            for key, size, original_path in mhl_entries(mhl, **self.backup_entry_options()):
+                if key in sample:
+                    backup_sizes[key] = size
+
+            self.logger.advance(bytes_done=self.inventory.signature(mhl)[0], current_file=mhl)
+
+        missing_files = [x for x in sample if x not in backup_sizes]
+        wrong_files = [x for x in sample if x in backup_sizes and backup_sizes[x] != sample[x]]
+
+        return QuickCheckResult(" ".join(mhl_display_name(x) for x in backup_mhls), len(sample),
+                                self.source_entry_count, missing_files, wrong_files)
+
+    def report_quick_check(self, result):
+
+        self.logger.log(f'\n{result.name} - quick check', report=True)
+        self.logger.log(f'{result.sample_size} of {result.total} source entries sampled', report=True)
+
+        estimate, low, high = result.estimate()
+
+        if result.failures():
+            self.lock_error()
+
+            self.logger.error(f'[PROVISIONAL FAIL] {result.failures()} sampled entries are missing or the wrong size - '
+                              f'estimated {estimate:.0f} failed entries in total ({low:.0f} to {high:.0f} at 95% '
+                              f'confidence)', report=True)
+
+            self.report_check_list((self.original_path(x) for x in result.missing_files), "Missing source indexes")
+            self.report_check_list((self.original_path(x) for x in result.wrong_files), "Incorrect source indexes")
+
+        elif result.is_exact():
+            self.logger.passed('[PROVISIONAL PASS] every source entry was sampled, and all are on the backup',
+                               report=True)
+
+        else:
+            self.logger.passed(f'[PROVISIONAL PASS] no sampled entries failed - at 95% confidence fewer than '
+                               f'{math.ceil(high)} entries ({high / result.total:.3%}) are missing or the wrong size',
+                               report=True)
+
+    def open_checkpoint(self, resume):
+
+        """start a checkpoint file for this check, restoring any finished work from a previous run if resuming"""
+
+        config = (__version__, tuple(self.source_folders), self.backup_pattern, self.backup_trim, self.dual_backups,
+                  self.add_parent_folders, self.require_ale, tuple(self.ignore_files.ignore_list), self.compare_hashes,
+                  self.normalise_keys)
+
+        try:
+            checkpoint = Checkpoint(self.root_folder, config, resume=resume)
+
+        except OSError as error:
+            self.logger.warning(f"[WARNING] Could not write checkpoint file - {error}")
+            return None
+
+        if checkpoint.restored:
+            self.logger.log(f"Resuming from checkpoint - {len(checkpoint.mhls)} MHLs already loaded")
+            checkpoint.restore_mhls(self.mhl_cache)
+
+        self.source_signature = mhl_signatures(self.source_mhls)
+
+        return checkpoint
+
     def get_source_mhls(self):
 
         """search the source folders for mhls, and return a list of the mhl filenames"""
@@ -81,19 +386,26 @@ class BackupChecker:
         self.logger.log("Source MHLs:", report=True)
         for this_source_folder in self.source_folders:
 
-            if not os.path.exists(os.path.join(self.root_folder, this_source_folder)):
+            if not self.inventory.is_dir(os.path.join(self.root_folder, this_source_folder)):
                 message = f"[WARNING] {this_source_folder} folder not found"
                 self.logger.warning(message, report=True)
 
             else:
-                for root, dirs, files in os.walk(os.path.join(self.root_folder, this_source_folder)):
+                for root, dirs, files in self.inventory.walk(os.path.join(self.root_folder, this_source_folder)):
+
+                    # an ascmhl folder is read as one source, rather than as its generation manifests
+                    if os.path.basename(root) == mhl_v2.FOLDER_NAME and mhl_v2.CHAIN_FILE_NAME in files:
+                        self.logger.log(os.path.relpath(root, os.path.dirname(os.path.dirname(root))), report=True)
+                        mhl_list.append(root)
+                        continue
+
                     for file in files:
 
-                        if str(file).endswith(".mhl"):
+                        if str(file).endswith(MHL_EXTENSIONS):
                             self.logger.log(file, report=True)
                             mhl_list.append(os.path.join(root, file))
 
-                        elif str(file) in self.ignore_files.ignore_list:
+                        elif self.ignore_files.matches(str(file)):
                             self.logger.log(f"Skipped excluded file in source files {str(file)}")
 
                         else:
@@ -112,8 +424,12 @@ class BackupChecker:
 
         folder_to_scan = self.get_folder_to_scan()
 
-        mhl_list = [os.path.join(folder_to_scan, file) for file in os.listdir(folder_to_scan) if
-                    file.endswith(".mhl")]
+        mhl_list = [os.path.join(folder_to_scan, file) for file in self.inventory.files(folder_to_scan) if
+                    file.endswith(MHL_EXTENSIONS)]
+
+        # backups kept as ascmhl folders, in a folder named after the tape or drive
+        mhl_list += [x for x in (os.path.join(folder_to_scan, folder, mhl_v2.FOLDER_NAME) for folder in
+                                 self.inventory.folders(folder_to_scan)) if mhl_v2.is_ascmhl_folder(x)]
 
         if not mhl_list:
             raise BackupCheckerException("No backups found in specified folder")
@@ -128,7 +444,7 @@ class BackupChecker:
 
         folder_to_scan = self.get_folder_to_scan()
 
-        for file in os.listdir(folder_to_scan):
+        for file in self.inventory.files(folder_to_scan):
 
             if file.endswith(".ale") or file.endswith(".ALE"):
                 file = os.path.join(folder_to_scan, file)
@@ -148,16 +464,31 @@ class BackupChecker:
 
         dictionary = {}
 
-        mhl: str
-        for mhl in self.source_mhls:
-            self.logger.log(f"Loading source {os.path.basename(mhl)}")
+        self.logger.start_phase("Loading sources", bytes_total=self.inventory.total_size(self.source_mhls))
 
-            dictionary.update(mhl_to_dict(mhl, add_parent_folders=self.add_parent_folders))
+        self.start_read_ahead(self.source_mhls, **self.source_parse_options())
+
+        try:
+            mhl: str
+            for mhl in self.source_mhls:
+                self.logger.log(f"Loading source {os.path.basename(mhl)}")
+
+                mhl_dictionary = self.load_mhl(mhl, **self.source_parse_options())
+                dictionary.update(mhl_dictionary)
+
+                if self.source_hashes:
+                    self.source_digests.update(mhl_dictionary.digests)
+
+                if self.normalise_keys:
+                    self.source_originals.update(mhl_dictionary.originals)
+
+        finally:
+            self.stop_read_ahead()
 
         out_dictionary = {}
 
         for key, value in dictionary.items():
-            if os.path.basename(key) in self.ignore_files.ignore_list:
+            if self.ignore_files.matches(os.path.basename(self.original_path(key))):
                 self.logger.log(f"Skipped excluded file in source index {key}")
             else:
                 out_dictionary[key] = value
@@ -204,7 +535,7 @@ class BackupChecker:
 
         for mhl in self.backup_mhls:
 
-            base = os.path.basename(mhl)
+            base = mhl_display_name(mhl) + '.mhl'
 
             # match standard LTO (LTO001)
             if re.search(r'^[A-Z\d]{4}\d{2}\.mhl', base):
@@ -254,20 +585,145 @@ class BackupChecker:
 
         backups = []
 
-        for group in self.backup_groups:
-            backup = self.Backup(self.source_dictionary, group, self, self.ale_clips)
-            backups.append(backup)
+        self.logger.start_phase("Loading backups", bytes_total=self.inventory.total_size(self.backup_mhls))
+
+        if not self.use_index:
+            self.start_read_ahead([x for group in self.backup_groups for x in group], use_cache=not self.lean,
+                                  **self.backup_parse_options())
+
+        try:
+            for group in self.backup_groups:
+                backup = self.Backup(self.source_dictionary, group, self, self.ale_clips)
+                backups.append(backup)
+
+        finally:
+            self.stop_read_ahead()
 
         return backups
 
+    def load_extra_ignore_rules(self):
+
+        """add the ignore rules from the preset's ignore file and from an ignore file in the day or verifier folder"""
+
+        file_paths = [self.ignore_file] if self.ignore_file else []
+
+        for folder in [self.root_folder, os.path.join(self.root_folder, 'Verifier')]:
+            if self.inventory.is_dir(folder) and IgnoredFiles.default_file in self.inventory.files(folder):
+                file_paths.append(os.path.join(folder, IgnoredFiles.default_file))
+
+        if not file_paths:
+            return self.ignore_files
+
+        for file_path in file_paths:
+            self.logger.log(f"Loading ignore rules from {file_path}")
+
+        try:
+            return self.ignore_files.extended(file_paths)
+
+        except OSError as error:
+            raise BackupCheckerException(f"Could not load ignore rules - {error}")
+
+    def source_parse_options(self):
+
+        return {'add_parent_folders': self.add_parent_folders, 'hashes': self.source_hashes,
+                'normalise_keys': self.normalise_keys}
+
+    def backup_parse_options(self):
+
+        return {'trim_top_levels': self.backup_trim, 'root_pattern': self.backup_pattern,
+                'hashes': self.compare_hashes, 'normalise_keys': self.normalise_keys}
+
+    def backup_entry_options(self):
+
+        return {'trim_top_levels': self.backup_trim, 'root_pattern': self.backup_pattern,
+                'normalise_keys': self.normalise_keys}
+
+    def fingerprint_sources(self):
+
+        """return a fingerprint of every source index and size, and the source indexes in the same order"""
+
+        if self.source_fingerprints is None:
+            self.source_fingerprints = numpy.fromiter((fingerprint(x) for x in self.source_dictionary.items()),
+                                                      dtype=numpy.uint64, count=len(self.source_dictionary))
+            self.source_keys = list(self.source_dictionary)
+
+        return self.source_fingerprints, self.source_keys
+
+    def original_path(self, key):
+
+        """return a source index as it was written in its mhl, before key normalisation"""
+
+        return self.source_originals.get(key, key)
+
+    def normalise(self, path):
+
+        """return a path as it would appear in the keys, after any key normalisation"""
+
+        return normalise_key(path) if self.normalise_keys else path
+
+    def load_mhl(self, mhl, **parse_options):
+
+        """load a mhl through the cache, taking its contents from the read-ahead reader if one is running"""
+
+        return self.mhl_cache.load(mhl, signature=self.inventory.signature(mhl),
+                                   progress=self.mhl_progress(mhl),
+                                   on_parsed=self.checkpoint.record_mhl if self.checkpoint else None,
+                                   lines=self.mhl_reader.lines(mhl) if self.mhl_reader else None,
+                                   **parse_options)
+
+    def mhl_progress(self, mhl):
+
+        """return a progress callback for parsing a mhl, which reports progress through the file on disk"""
+
+        size = self.inventory.signature(mhl)[0]
+
+        return self.logger.file_progress(mhl, scale=mhl_progress_scale(mhl, size), size=size)
+
+    def start_read_ahead(self, mhl_list, use_cache=True, **parse_options):
+
+        """start reading the mhls which aren't already cached on a background thread, in the order they'll be parsed.
+        If use_cache is False, every mhl is read"""
+
+        if not self.read_ahead_depth:
+            return
+
+        # ascmhl folders and v2 manifests are parsed as xml straight from disk
+        to_read = [x for x in mhl_list if not is_ascmhl(x) and (
+            not use_cache or not self.mhl_cache.is_current(x, self.inventory.signature(x), **parse_options))]
+
+        if to_read:
+            self.mhl_reader = ReadAheadReader(to_read, chunk_size=self.read_ahead_chunk_size,
+                                              queue_depth=self.read_ahead_depth)
+
+    def stop_read_ahead(self):
+
+        if self.mhl_reader:
+            self.mhl_reader.close()
+            self.mhl_reader = None
+
     def run_backup_checks(self):
 
         """for each backup, run mhl checks, ale checks, and report"""
 
-        for backup in self.backups:
-            backup.compare_mhls()
-            backup.compare_clip_list()
-            backup.report_backup()
+        self.logger.start_phase("Comparing", entries_total=len(self.source_dictionary) * len(self.backups))
+
+        if self.compare_processes > 1 and not self.lean and not self.compare_hashes:
+            self.sharded_comparison = mhl_compare.ShardedComparison(*hash_columns(self.source_dictionary),
+                                                                    processes=self.compare_processes)
+            self.source_keys = list(self.source_dictionary)
+
+        try:
+            for backup in self.backups:
+                backup.compare_mhls()
+                backup.compare_clip_list()
+                backup.report_backup()
+
+        finally:
+            if self.sharded_comparison:
+                self.sharded_comparison.close()
+                self.sharded_comparison = None
+
+        self.logger.finish_progress()
 
     def check_indexes_vs_scanned(self):
 
@@ -276,7 +732,8 @@ class BackupChecker:
                 f'\nScanned file count {len(self.files_scanned)} does not match index count {len(self.source_dictionary)}',
                 True)
 
-            diff = set(self.files_scanned) ^ set([os.path.basename(x) for x in self.source_dictionary.keys()])
+            diff = set(self.files_scanned) ^ set([os.path.basename(self.original_path(x))
+                                                  for x in self.source_dictionary.keys()])
 
             cutoff_count = 5
             cutoff = False
@@ -292,9 +749,9 @@ class BackupChecker:
 
     def write_report_file(self):
 
-        """write out the saved log report to a file in the day folder"""
+        """finish the streamed report and results files, and name them with the check's result"""
 
-        if 'unittest' in sys.modules.keys():
+        if self.report_writer is None:
             self.logger.log("Running in test mode, file report will not be written")
             return
 
@@ -317,19 +774,15 @@ class BackupChecker:
         else:
             result = 'UNKNOWN'
 
-        file_name = f'{os.path.basename(self.root_folder)} - checks {result} - {current_time}.txt'
+        file_name = f'{os.path.basename(self.root_folder)} - checks {result} - {current_time}'
 
-        file_path = os.path.join(self.root_folder, file_name)
-
-        with open(file_path, "w") as file_handler:
-
-            file_handler.write("\n".join(self.logger.log_report))
+        self.report_writer.finish(os.path.join(self.root_folder, file_name))
 
     def get_folder_to_scan(self):
 
         """check if a verifier folder exists, and return it. Otherwise, return the day folder"""
 
-        if os.path.isdir(os.path.join(self.root_folder, 'Verifier')):
+        if self.inventory.is_dir(os.path.join(self.root_folder, 'Verifier')):
 
             folder_to_scan = os.path.join(self.root_folder, 'Verifier')
         else:
@@ -337,6 +790,118 @@ class BackupChecker:
 
         return folder_to_scan
 
+    def report_check_list(self, check_list, check_list_name, warning=False):
+
+        """report a specified check's results, as errors or as warnings. check_list can be any iterable, and is
+        streamed to the report rather than held in memory"""
+
+        report_function = self.logger.warning if warning else self.logger.error
+
+        check_list = iter(check_list)
+        first_value = next(check_list, None)
+
+        if first_value is None:
+            self.logger.passed(f'{check_list_name} - None', report=True)
+            return True
+
+        report_function(check_list_name, report=True)
+        cutoff_count = 5
+        cutoff = False
+        count = 0
+
+        for index, value in enumerate(itertools.chain([first_value], check_list)):
+
+            report_function(f'\t{value}', report=True, supress_log=cutoff)
+            count += 1
+
+            if index >= cutoff_count + 1:
+                cutoff = True
+        if cutoff:
+            more = f'\t...and {count - cutoff_count} more'
+
+            if self.report_writer:
+                more += ' - see the report and results files for the full list'
+
+            report_function(more)
+
+        return False
+
+    def verify_source_files(self):
+
+        """re-hash the source files on disk, and check they still match the hashes in their source mhls"""
+
+        rehasher = mhl_rehash.Rehasher(io_concurrency=self.verify_concurrency, per_device=self.verify_per_device,
+                                       use_mmap=self.verify_mmap)
+
+        self.logger.start_phase("Re-hashing sources",
+                                bytes_total=sum(int(x) for x in self.source_dictionary.values() if x.isdigit()))
+
+        changed_files = []
+        missing_files = []
+        unsupported_count = 0
+        files_verified = 0
+
+        for job, status, bytes_read in rehasher.run(self.source_rehash_jobs(),
+                                                    progress=lambda x: self.logger.advance(bytes_done=x, entries=1)):
+
+            if status == 'ok':
+                files_verified += 1
+
+            elif status == 'changed':
+                changed_files.append(job.key)
+                self.lock_error()
+
+            elif status == 'missing':
+                missing_files.append(job.key)
+
+            else:
+                unsupported_count += 1
+
+        self.logger.finish_progress()
+
+        self.logger.log('\nSource media re-hash', True)
+        self.logger.log(f'{files_verified} source files re-hashed', report=True)
+
+        for volume, throughput in rehasher.throughput().items():
+            self.logger.log(f'{volume} - {throughput / 1_000_000:.1f} MB/s', report=True)
+
+        self.report_check_list(sorted(self.original_path(x) for x in changed_files), "Source files changed on disk")
+
+        if missing_files:
+            self.report_check_list(sorted(self.original_path(x) for x in missing_files),
+                                   "[WARNING] Source files missing on disk", warning=True)
+
+        if unsupported_count:
+            self.logger.warning(f'[WARNING] {unsupported_count} source files could not be re-hashed, as their hash type '
+                                f'is missing or not supported', report=True)
+
+    def source_rehash_jobs(self):
+
+        """yield a re-hash job for every file in the source index, with its path on disk and its mhl hash"""
+
+        for mhl in self.source_mhls:
+
+            mhl_dictionary = self.mhl_cache.load(mhl, signature=self.inventory.signature(mhl),
+                                                 **self.source_parse_options())
+
+            # source paths are relative to the mhl, with any parent folders added to the front
+            base_folder = os.path.dirname(mhl_anchor(mhl))
+
+            for _ in range(self.add_parent_folders):
+                base_folder = os.path.dirname(base_folder)
+
+            for key in mhl_dictionary.keys():
+
+                if key not in self.source_dictionary:
+                    continue
+
+                digest = mhl_dictionary.digests.get(key)
+                kind, digest = digest if digest else (None, None)
+
+                file_path = os.path.join(base_folder, *self.original_path(key).split(os.path.sep))
+
+                yield mhl_rehash.RehashJob(key, file_path, kind, digest)
+
     def lock_error(self):
 
         """
@@ -352,7 +917,7 @@ class BackupChecker:
 
             self.parent = parent
 
-            self.name = " ".join([os.path.basename(x).strip(".mhl") for x in backup_mhl_list])
+            self.name = " ".join([mhl_display_name(x) for x in backup_mhl_list])
 
             self.checked = False
             self.backup_report = []
@@ -364,177 +929,1563 @@ class BackupChecker:
             self.ale_clips = ale_clips
 
             self.source_dictionary = source_dictionary
-            self.backup_dictionary = self.backup_mhls_to_dict()
+
+            # in the low memory mode the backup is held as a fingerprint filter, and the dictionary only gets the
+            # backup sizes of files that failed it
+            self.backup_filter = None
+            self.backup_base_names = set()
+
+            if parent.lean:
+                self.backup_dictionary = {}
+                self.backup_filter = self.backup_mhls_to_filter()
+
+            elif parent.use_index:
+                self.backup_dictionary = self.backup_mhls_to_index()
+
+            else:
+                self.backup_dictionary = self.backup_mhls_to_dict()
 
             self.missing_files = []
             self.wrong_files = []
+            self.wrong_hashes = []
             self.missing_delivery = []
 
+            self.unverified_hashes = 0
+
+            self.relocated_files = {}
+
         def backup_mhls_to_dict(self):
 
             """take the list of backup mhl filenames, and return a dictionary of every file and file size combination"""
 
-            dictionary = {}
+            dictionary = MhlDictionary(digests=DigestStore() if self.parent.compare_hashes else None)
 
             for mhl in self.backups:
                 self.parent.logger.log(f'\nLoading backup {os.path.basename(mhl)}')
 
-                dictionary.update(mhl_to_dict(mhl,
-                                              trim_top_levels=self.parent.backup_trim,
-                                              root_pattern=self.parent.backup_pattern))
+                mhl_dictionary = self.parent.load_mhl(mhl, **self.parent.backup_parse_options())
+                dictionary.update(mhl_dictionary)
+
+                if self.parent.compare_hashes:
+                    dictionary.digests.update(mhl_dictionary.digests)
 
                 self.parent.logger.log(f'Normalised backup path: {list(dictionary.keys())[0]}')
 
             return dictionary
 
-        def compare_mhls(self):
+        def backup_mhls_to_index(self):
 
-            """check that every source index in the source dictionary is in the backup dictionary"""
+            """open the index file of each backup mhl, parsing the mhl and writing its index first if it has none"""
 
-            errors = 0
+            indexes = []
+            options = self.parent.backup_entry_options()
 
-            for source_file, source_size in self.source_dictionary.items():
+            for mhl in self.backups:
+                signature = self.parent.inventory.signature(mhl)
+                index = mhl_index.open_index(mhl, signature, options)
 
-                if source_file in self.backup_dictionary.keys():
+                if index is None:
+                    self.parent.logger.log(f'\nIndexing backup {os.path.basename(mhl)}')
 
-                    if source_size == self.backup_dictionary[source_file]:
-                        pass
+                    dictionary = mhl_to_dict(mhl, progress=self.parent.mhl_progress(mhl), **options)
 
-                    else:
-                        self.wrong_files.append(source_file)
-                        self.parent.lock_error()
+                    try:
+                        mhl_index.write_index(mhl, dictionary, signature, options)
+
+                    except (OSError, ValueError) as error:
+                        self.parent.logger.log(f'Could not index {os.path.basename(mhl)} - {error}')
+                        indexes.append(dictionary)
+                        continue
+
+                    index = mhl_index.open_index(mhl, signature, options)
 
                 else:
-                    self.missing_files.append(source_file)
-                    self.parent.lock_error()
+                    self.parent.logger.log(f'\nOpened index of backup {os.path.basename(mhl)}')
+                    self.parent.logger.advance(bytes_done=signature[0], current_file=mhl)
 
-                self.files_checked += 1
+                indexes.append(index)
 
-            self.checked = True
+            return mhl_index.IndexGroup(indexes)
 
-            return errors
+        def backup_mhls_to_filter(self):
 
-        def compare_clip_list(self):
+            """stream the backup mhls into a fingerprint filter, keeping only the file names the ale needs"""
 
-            """check that every clip in the ale clip list is in the backup dictionary"""
+            fingerprints = array('Q')
+            clip_names = self.ale_clip_names()
 
-            backup_file_base = [os.path.basename(x) for x in self.backup_dictionary.keys()]
+            for mhl in self.backups:
+                self.parent.logger.log(f'\nStreaming backup {os.path.basename(mhl)}')
 
-            if self.ale_clips is None:
-                return
+                lines = self.parent.mhl_reader.lines(mhl) if self.parent.mhl_reader else None
 
-            for clip in self.ale_clips:
+                for key, size, original_path in mhl_entries(mhl, lines=lines, **self.parent.backup_entry_options()):
+                    fingerprints.append(fingerprint((key, size)))
 
-                self.ale_clips_checked += 1
+                    name = os.path.basename(key)
 
-                frame_range_match = re.search(r'\[(\d+)-(\d+)]', clip)
+                    if name in clip_names:
+                        self.backup_base_names.add(name)
 
-                if frame_range_match:
+                self.parent.logger.advance(bytes_done=self.parent.inventory.signature(mhl)[0], current_file=mhl)
 
-                    frame_number = frame_range_match.group(2)
+            return FingerprintFilter(fingerprints)
 
-                    entry_file = re.sub(r'\[\d+-\d+]', frame_number, clip)
+        def compare_fingerprints(self):
 
-                else:
-                    entry_file = clip
+            """
+            check the source indexes against the backup's fingerprint filter, then stream the backup mhls again to get
+            the sizes of only the files that failed, to tell missing files from files with the wrong size
+            """
 
-                if entry_file in backup_file_base:
-                    pass
+            source_fingerprints, source_keys = self.parent.fingerprint_sources()
 
-                else:
-                    self.parent.lock_error()
-                    self.missing_delivery.append(clip)
+            failed = numpy.flatnonzero(~self.backup_filter.contains(source_fingerprints[self.files_checked:]))
+            failed_files = {source_keys[self.files_checked + x] for x in failed}
 
-        def report_backup(self):
+            if failed_files:
+                for mhl in self.backups:
+                    for key, size, original_path in mhl_entries(mhl, **self.parent.backup_entry_options()):
+                        if key in failed_files:
+                            self.backup_dictionary[key] = size
+
+            for source_file in source_keys[self.files_checked:]:
+
+                if source_file not in failed_files:
+                    continue
+
+                if source_file in self.backup_dictionary:
+                    self.wrong_files.append(source_file)
+                else:
+                    self.missing_files.append(source_file)
+
+                self.parent.lock_error()
+
+            self.files_checked = len(source_keys)
+
+        def compare_sharded(self):
+
+            """compare the source indexes with the backup dictionary in the parent's process pool"""
+
+            source_keys = self.parent.source_keys
+
+            missing, wrong = self.parent.sharded_comparison.compare(*hash_columns(self.backup_dictionary))
+
+            self.missing_files += [source_keys[x] for x in missing if x >= self.files_checked]
+            self.wrong_files += [source_keys[x] for x in wrong if x >= self.files_checked]
+
+            if self.missing_files or self.wrong_files:
+                self.parent.lock_error()
+
+            self.files_checked = len(source_keys)
+
+        def compare_mhls(self):
+
+            """check that every source index in the source dictionary is in the backup dictionary"""
+
+            errors = 0
+
+            checkpoint = self.parent.checkpoint
+            restored = checkpoint.comparison(self.name, self.checkpoint_signature()) if checkpoint else None
+
+            if restored:
+                self.missing_files = list(restored['missing_files'])
+                self.wrong_files = list(restored['wrong_files'])
+                self.wrong_hashes = list(restored['wrong_hashes'])
+                self.unverified_hashes = restored['unverified_hashes']
+                self.files_checked = restored['position']
+
+                if self.missing_files or self.wrong_files or self.wrong_hashes:
+                    self.parent.lock_error()
+
+            recorded = self.result_counts()
+
+            if self.parent.lean or self.parent.sharded_comparison:
+                files_checked = self.files_checked
+
+                if self.parent.lean:
+                    self.compare_fingerprints()
+                else:
+                    self.compare_sharded()
+
+                self.parent.logger.advance(entries=self.files_checked - files_checked, current_file=self.name)
+
+                if checkpoint:
+                    self.record_comparison(recorded)
+
+                self.checked = True
+
+                return errors
+
+            source_digests = self.parent.source_digests
+            backup_digests = self.backup_dictionary.digests if self.parent.compare_hashes else None
+
+            for source_file, source_size in itertools.islice(self.source_dictionary.items(), self.files_checked, None):
+
+                if source_file in self.backup_dictionary.keys():
+
+                    if source_size == self.backup_dictionary[source_file]:
+
+                        if backup_digests is not None:
+                            self.compare_digests(source_file, source_digests, backup_digests)
+
+                    else:
+                        self.wrong_files.append(source_file)
+                        self.parent.lock_error()
+
+                else:
+                    self.missing_files.append(source_file)
+                    self.parent.lock_error()
+
+                self.files_checked += 1
+
+                if not self.files_checked % 65536:
+                    self.parent.logger.advance(entries=65536, current_file=self.name)
+
+                    if checkpoint and checkpoint.due():
+                        self.record_comparison(recorded)
+                        recorded = self.result_counts()
+
+            self.parent.logger.advance(entries=self.files_checked % 65536, current_file=self.name)
+
+            if checkpoint:
+                self.record_comparison(recorded)
+
+            self.checked = True
+
+            return errors
+
+        def compare_digests(self, source_file, source_digests, backup_digests):
+
+            """check that a file has the same hash in the source and the backup, if both used the same hash type"""
+
+            source_digest = source_digests.get(source_file)
+            backup_digest = backup_digests.get(source_file)
+
+            if source_digest is None or backup_digest is None or source_digest[0] != backup_digest[0]:
+                self.unverified_hashes += 1
+
+            elif source_digest[1] != backup_digest[1]:
+                self.wrong_hashes.append(source_file)
+                self.parent.lock_error()
+
+        def result_counts(self):
+
+            return len(self.missing_files), len(self.wrong_files), len(self.wrong_hashes)
+
+        def record_comparison(self, recorded):
+
+            """save the comparison's position, and the results found since it was last saved, to the checkpoint"""
+
+            self.parent.checkpoint.record_comparison(self.name, self.checkpoint_signature(), self.files_checked,
+                                                     self.missing_files[recorded[0]:],
+                                                     self.wrong_files[recorded[1]:],
+                                                     self.wrong_hashes[recorded[2]:],
+                                                     self.unverified_hashes)
+
+        def checkpoint_signature(self):
+
+            return mhl_signatures(self.backups), self.parent.source_signature
+
+        def compare_clip_list(self):
+
+            """check that every clip in the ale clip list is in the backup dictionary"""
+
+            checkpoint = self.parent.checkpoint
+            restored = checkpoint.comparison(self.name, self.checkpoint_signature()) if checkpoint else None
+
+            if restored and restored['clips']:
+                self.missing_delivery, self.ale_clips_checked = restored['clips']
+
+                if self.missing_delivery:
+                    self.parent.lock_error()
+
+                return
+
+            if self.ale_clips is None:
+                return
+
+            if self.backup_filter is None:
+                self.backup_base_names = {os.path.basename(x) for x in self.backup_dictionary.keys()}
+
+            for clip in self.ale_clips:
+
+                self.ale_clips_checked += 1
+
+                entry_file = ale_entry_name(clip)
+
+                if self.parent.normalise(entry_file) in self.backup_base_names:
+                    pass
+
+                else:
+                    self.parent.lock_error()
+                    self.missing_delivery.append(clip)
+
+            if checkpoint:
+                checkpoint.record_clips(self.name, self.checkpoint_signature(), self.missing_delivery,
+                                        self.ale_clips_checked)
+
+        def ale_clip_names(self):
+
+            """return the backup file name each ale clip should have, after any key normalisation"""
+
+            if self.ale_clips is None:
+                return set()
+
+            return {self.parent.normalise(ale_entry_name(x)) for x in self.ale_clips}
+
+        def report_backup(self):
 
             """use the parent checker's logger to report each check's results"""
 
-            self.parent.logger.log(f'\n{self.name}', True)
-            self.parent.logger.log(f'{self.files_checked} files checked', report=True)
-            self.parent.logger.log(f'{self.ale_clips_checked} ALE clips checked', True)
+            self.parent.logger.log(f'\n{self.name}', True)
+            self.parent.logger.log(f'{self.files_checked} files checked', report=True)
+            self.parent.logger.log(f'{self.ale_clips_checked} ALE clips checked', True)
+
+            if self.missing_files:
+                self.find_relocated_files()
+
+            self.report_check_list((self.describe_missing(x) for x in self.missing_files), "Missing source indexes")
+            self.report_check_list((self.parent.original_path(x) for x in self.wrong_files),
+                                   "Incorrect source indexes")
+
+            if self.parent.compare_hashes:
+                self.report_check_list((self.parent.original_path(x) for x in self.wrong_hashes),
+                                       "Incorrect source hashes")
+
+                if self.unverified_hashes:
+                    self.parent.logger.warning(f'[WARNING] {self.unverified_hashes} files could not be hash checked, '
+                                               f'as the source and backup used different hash types', report=True)
+
+            self.report_check_list(self.missing_delivery, "Missing ALE clips")
+
+            if self.parent.report_writer:
+                self.write_results(self.parent.report_writer)
+
+        def write_results(self, report_writer):
+
+            """write every missing, wrong size, wrong hash and missing ALE entry to the results file"""
+
+            original_path = self.parent.original_path
+
+            for source_file in self.missing_files:
+                found_at = ' | '.join(f'{x} on {y}' for x, y in self.relocated_files.get(source_file, []))
+                report_writer.add_result(self.name, 'missing', original_path(source_file),
+                                         source_size=self.source_dictionary[source_file], found_at=found_at)
+
+            for source_file in self.wrong_files:
+                report_writer.add_result(self.name, 'wrong size', original_path(source_file),
+                                         source_size=self.source_dictionary[source_file],
+                                         backup_size=self.backup_dictionary[source_file])
+
+            for source_file in self.wrong_hashes:
+                report_writer.add_result(self.name, 'wrong hash', original_path(source_file),
+                                         source_size=self.source_dictionary[source_file])
+
+            for clip in self.missing_delivery:
+                report_writer.add_result(self.name, 'missing ale clip', clip)
+
+        def find_relocated_files(self):
+
+            """
+            Look for each missing file elsewhere in this backup, by size and hash, or by name and size. The reverse index
+            only holds backup entries whose name or size matches a missing file, so it stays small
+            """
+
+            source_digests = self.parent.source_digests if self.parent.compare_hashes else None
+
+            missing_names = {os.path.basename(x) for x in self.missing_files}
+            missing_sizes = {self.source_dictionary[x] for x in self.missing_files}
+
+            by_hash = {}
+            by_name = {}
+            original_files = {}
+
+            for mhl in self.backups:
+
+                tape = mhl_display_name(mhl)
+
+                for backup_file, backup_size, original_file, digest in self.backup_entries(mhl):
+
+                    if source_digests is not None and backup_size in missing_sizes and digest:
+                        by_hash.setdefault((backup_size, digest), []).append((backup_file, tape))
+
+                    name = os.path.basename(backup_file)
+
+                    if name in missing_names:
+                        by_name.setdefault((name, backup_size), []).append((backup_file, tape))
+
+                    if (name in missing_names or backup_size in missing_sizes) and self.parent.normalise_keys:
+                        original_files[backup_file] = original_file
+
+            for source_file in self.missing_files:
+
+                source_size = self.source_dictionary[source_file]
+                digest = source_digests.get(source_file) if source_digests is not None else None
+
+                candidates = by_hash.get((source_size, digest)) or by_name.get((os.path.basename(source_file),
+                                                                                  source_size))
+
+                if candidates:
+                    self.relocated_files[source_file] = [(original_files.get(x, x), y) for x, y in candidates]
+
+        def backup_entries(self, mhl):
+
+            """yield the key, size, path as written and hash of each entry in one of this backup's mhls, streaming the
+            mhl in the low memory mode"""
+
+            if self.parent.lean:
+                for key, size, original_path in mhl_entries(mhl, **self.parent.backup_entry_options()):
+                    yield key, size, original_path, None
+
+                return
+
+            if self.parent.use_index:
+                index = self.backup_dictionary.indexes[self.backups.index(mhl)]
+
+                for key, size in index.items():
+                    yield key, size, key, None
+
+                return
+
+            mhl_dictionary = self.parent.mhl_cache.load(mhl, signature=self.parent.inventory.signature(mhl),
+                                                        **self.parent.backup_parse_options())
+
+            for key, size in mhl_dictionary.items():
+                yield (key, size, mhl_dictionary.originals.get(key, key) if mhl_dictionary.originals else key,
+                       mhl_dictionary.digests.get(key) if mhl_dictionary.digests is not None else None)
+
+        def describe_missing(self, source_file):
+
+            """return a missing file, with where it was found if it was moved or renamed on the backup"""
+
+            candidates = self.relocated_files.get(source_file)
+
+            if not candidates:
+                return self.parent.original_path(source_file)
+
+            backup_file, tape = candidates[0]
+            description = f'{self.parent.original_path(source_file)} - found at {backup_file} on {tape}'
+
+            if len(candidates) > 1:
+                description += f' (and {len(candidates) - 1} other places)'
+
+            return description
+
+        def report_check_list(self, check_list, check_list_name):
+
+            """use the parent checker's logger to report a specified check's results"""
+
+            return self.parent.report_check_list(check_list, check_list_name)
+
+
+class BackupCheckerException(Exception):
+
+    def __init__(self, message="Verifier error"):
+        super().__init__(message)
+
+
+class Inventory:
+
+    """
+    A single listing of the day folder, its verifier folder and its source folder trees, shared by every phase of a
+    check. Folders are listed and mhls/ales are stat'ed concurrently, which hides the latency of network volumes
+    """
+
+    stat_extensions = MHL_EXTENSIONS + (".ale", ".ALE")
+
+    def __init__(self, root_folder, source_folders, concurrency=16):
+
+        self.root_folder = root_folder
+        self.concurrency = concurrency
+
+        # folder path -> (sub folder names, file names)
+        self.listings = {}
+        # file path -> (size, modification time)
+        self.stats = {}
+
+        asyncio.run(self.scan(source_folders))
+
+    async def scan(self, source_folders):
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        if not await self.list_folder(self.root_folder, semaphore):
+            raise FileNotFoundError(f'{self.root_folder} is not a valid folder')
+
+        folders = [os.path.join(self.root_folder, x) for x in source_folders]
+
+        await asyncio.gather(self.list_folder(os.path.join(self.root_folder, 'Verifier'), semaphore),
+                             *[self.walk_folder(x, semaphore) for x in folders])
+
+        to_stat = [os.path.join(folder, x) for folder, listing in self.listings.items() for x in listing[1]
+                   if x.endswith(self.stat_extensions)]
+
+        await asyncio.gather(*[self.stat_file(x, semaphore) for x in to_stat])
+
+    async def list_folder(self, folder, semaphore):
+
+        """list a folder, returning False if it doesn't exist"""
+
+        async with semaphore:
+
+            try:
+                self.listings[folder] = await asyncio.to_thread(read_folder, folder)
+
+            except (FileNotFoundError, NotADirectoryError):
+                return False
+
+        return True
+
+    async def walk_folder(self, folder, semaphore):
+
+        if await self.list_folder(folder, semaphore):
+            await asyncio.gather(*[self.walk_folder(os.path.join(folder, x), semaphore)
+                                   for x in self.listings[folder][0]])
+
+    async def stat_file(self, file_path, semaphore):
+
+        async with semaphore:
+            stat = await asyncio.to_thread(os.stat, file_path)
+
+        self.stats[file_path] = (stat.st_size, stat.st_mtime_ns)
+
+    def is_dir(self, folder):
+
+        return folder in self.listings
+
+    def folders(self, folder):
+
+        """return the sub folder names in a folder"""
+
+        if folder not in self.listings:
+            raise FileNotFoundError(f'{folder} is not a valid folder')
+
+        return list(self.listings[folder][0])
+
+    def files(self, folder):
+
+        """return the file names in a folder, like os.listdir"""
+
+        if folder not in self.listings:
+            raise FileNotFoundError(f'{folder} is not a valid folder')
+
+        return list(self.listings[folder][1])
+
+    def walk(self, folder):
+
+        """yield (folder, sub folder names, file names) for a folder tree, like os.walk"""
+
+        if folder not in self.listings:
+            return
+
+        dirs, files = self.listings[folder]
+
+        yield folder, list(dirs), list(files)
+
+        for sub_folder in dirs:
+            yield from self.walk(os.path.join(folder, sub_folder))
+
+    def signature(self, file_path):
+
+        """return the size and modification time of a file, stat'ing it only if it wasn't stat'ed in the scan. An ascmhl
+        folder's signature covers its manifests and chain file"""
+
+        if file_path not in self.stats and os.path.isdir(file_path):
+            self.stats[file_path] = mhl_v2.folder_signature(file_path)
+
+        elif file_path not in self.stats:
+            stat = os.stat(file_path)
+            self.stats[file_path] = (stat.st_size, stat.st_mtime_ns)
+
+        return self.stats[file_path]
+
+    def total_size(self, file_paths):
+
+        return sum(self.signature(x)[0] for x in file_paths)
+
+
+def read_folder(folder):
+
+    """return the sub folder names and file names in a folder. Like os.walk, linked folders are not followed"""
+
+    dirs = []
+    files = []
+
+    with os.scandir(folder) as entries:
+        for entry in entries:
+
+            if not entry.is_dir():
+                files.append(entry.name)
+
+            elif not entry.is_symlink():
+                dirs.append(entry.name)
+
+    return dirs, files
+
+
+class MhlCache:
+
+    """keep parsed mhl dictionaries in memory, so an unchanged mhl is only parsed once.
+    If max_entries is set, the least recently used mhls are evicted once the cache holds more file entries than that"""
+
+    def __init__(self, max_entries=None):
+
+        self.entries = OrderedDict()
+        self.max_entries = max_entries
+        self.entry_count = 0
+
+        self.lock = threading.Lock()
+
+    def load(self, mhl_file_path, signature=None, progress=None, on_parsed=None, lines=None, **parse_options):
+
+        """return the dictionary for a mhl, parsing it again only if its size or modification time has changed.
+        The signature (size, modification time) can be passed in if the file has already been stat'ed"""
+
+        if signature is None:
+            stat = os.stat(mhl_file_path)
+            signature = (stat.st_size, stat.st_mtime_ns)
+
+        cache_key = (mhl_file_path, tuple(sorted(parse_options.items())))
+
+        with self.lock:
+            cached = self.entries.get(cache_key)
+
+            if cached and cached[0] == signature:
+                self.entries.move_to_end(cache_key)
+
+                if progress:
+                    progress(signature[0], len(cached[1]))
+
+                return cached[1]
+
+        dictionary = mhl_to_dict(mhl_file_path, progress=progress, lines=lines, **parse_options)
+
+        self.add(cache_key, signature, dictionary)
+
+        if on_parsed:
+            on_parsed(cache_key, signature, dictionary)
+
+        return dictionary
+
+    def is_current(self, mhl_file_path, signature, **parse_options):
+
+        """return True if the mhl is cached with these parse options and hasn't changed"""
+
+        with self.lock:
+            cached = self.entries.get((mhl_file_path, tuple(sorted(parse_options.items()))))
+
+        return bool(cached) and cached[0] == signature
+
+    def add(self, cache_key, signature, dictionary):
+
+        with self.lock:
+            self.remove(cache_key)
+            self.entries[cache_key] = (signature, dictionary)
+            self.entry_count += len(dictionary)
+            self.evict()
+
+    def remove(self, cache_key):
+
+        cached = self.entries.pop(cache_key, None)
+
+        if cached:
+            self.entry_count -= len(cached[1])
+
+    def evict(self):
+
+        """drop the least recently used mhls until the cache is within its size limit, always keeping the newest"""
+
+        if not self.max_entries:
+            return
+
+        while self.entry_count > self.max_entries and len(self.entries) > 1:
+            self.remove(next(iter(self.entries)))
+
+    def discard_missing(self):
+
+        """drop cached mhls which no longer exist on disk"""
+
+        with self.lock:
+            for cache_key in [x for x in self.entries.keys() if not os.path.exists(x[0])]:
+                self.remove(cache_key)
+
+
+class ReadAheadReader:
+
+    """
+    Read a list of files on a background thread in large sequential chunks, and hand them to the parser through a
+    bounded queue, so the next mhl streams off disk while the current one is parsed
+    """
+
+    def __init__(self, file_paths, chunk_size=8 * 1024 * 1024, queue_depth=4):
+
+        self.file_paths = file_paths
+        self.chunk_size = chunk_size
+
+        self.queue = queue.Queue(maxsize=queue_depth)
+        self.stopped = threading.Event()
+
+        self.thread = threading.Thread(target=self.read_files, daemon=True)
+        self.thread.start()
+
+    def read_files(self):
+
+        for file_path in self.file_paths:
+
+            try:
+                with open_mhl(file_path, 'rb') as file_handler:
+
+                    while not self.stopped.is_set():
+                        chunk = file_handler.read(self.chunk_size)
+
+                        if not chunk:
+                            break
+
+                        self.put((file_path, chunk))
+
+            except OSError as error:
+                self.put((file_path, error))
+
+            else:
+                self.put((file_path, None))
+
+    def put(self, item):
+
+        while not self.stopped.is_set():
+
+            try:
+                self.queue.put(item, timeout=0.1)
+                return
+
+            except queue.Full:
+                pass
+
+    def lines(self, file_path):
+
+        """yield the decoded lines of one file. Files must be consumed in the order they were given, and any files
+        before this one which weren't consumed are skipped"""
+
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        pending = ''
+
+        while True:
+
+            chunk_path, chunk = self.queue.get()
+
+            if chunk_path != file_path:
+                continue
+
+            if isinstance(chunk, OSError):
+                raise chunk
+
+            if chunk is None:
+                break
+
+            split_lines = (pending + decoder.decode(chunk)).splitlines(keepends=True)
+            pending = split_lines.pop() if split_lines and not split_lines[-1].endswith('\n') else ''
+
+            yield from split_lines
+
+        pending += decoder.decode(b'', final=True)
+
+        if pending:
+            yield pending
+
+    def close(self):
+
+        """stop the reader thread and discard anything still queued"""
+
+        self.stopped.set()
+
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                break
+
+        self.thread.join()
+
+
+class Checkpoint:
+
+    """
+    An append-only file in the day folder recording parsed mhls and comparison progress as a check runs,
+    so an interrupted check can be resumed without repeating finished work
+    """
+
+    file_name = '.mhl_crosscheck_checkpoint'
+
+    def __init__(self, root_folder, config, resume=False, save_interval=30.0):
+
+        self.file_path = os.path.join(root_folder, self.file_name)
+        self.config = config
+
+        self.save_interval = save_interval
+        self.last_save = time.monotonic()
+
+        self.mhls = {}
+        self.comparisons = {}
+
+        self.restored = resume and self.read()
+
+        self.file_handler = open(self.file_path, 'ab' if self.restored else 'wb')
+
+        if not self.restored:
+            self.write(('config', config))
+
+    def read(self):
+
+        """load the records of a previous run, returning False if there are none or they are for another config"""
+
+        if not os.path.isfile(self.file_path):
+            return False
+
+        with open(self.file_path, 'rb') as file_handler:
+
+            try:
+                record = pickle.load(file_handler)
+
+            except (EOFError, pickle.UnpicklingError):
+                return False
+
+            if record != ('config', self.config):
+                return False
+
+            while True:
+
+                # a record cut short by the interruption is ignored, along with anything after it
+                try:
+                    record = pickle.load(file_handler)
+
+                except (EOFError, pickle.UnpicklingError, ValueError):
+                    break
+
+                if record[0] == 'mhl':
+                    self.mhls[record[1]] = (record[2], record[3])
+
+                else:
+                    self.restore_comparison(record)
+
+        return True
+
+    def restore_comparison(self, record):
+
+        kind, backup_name, signature = record[:3]
+
+        state = self.comparisons.get(backup_name)
+
+        if not state or state['signature'] != signature:
+            state = {'signature': signature, 'position': 0, 'missing_files': [], 'wrong_files': [], 'wrong_hashes': [],
+                     'unverified_hashes': 0, 'clips': None}
+            self.comparisons[backup_name] = state
+
+        if kind == 'compare':
+            state['position'] = record[3]
+            state['missing_files'] += record[4]
+            state['wrong_files'] += record[5]
+            state['wrong_hashes'] += record[6]
+            state['unverified_hashes'] = record[7]
+
+        elif kind == 'clips':
+            state['clips'] = (record[3], record[4])
+
+    def restore_mhls(self, mhl_cache):
+
+        for cache_key, (signature, dictionary) in self.mhls.items():
+            mhl_cache.add(cache_key, signature, dictionary)
+
+    def comparison(self, backup_name, signature):
+
+        """return the saved state of a backup's comparisons, if it was made against the same mhls"""
+
+        state = self.comparisons.get(backup_name)
+
+        if state and state['signature'] == signature:
+            return state
+
+        return None
+
+    def due(self):
+
+        return time.monotonic() - self.last_save >= self.save_interval
+
+    def record_mhl(self, cache_key, signature, dictionary):
+
+        self.write(('mhl', cache_key, signature, dictionary))
+
+    def record_comparison(self, backup_name, signature, position, new_missing_files, new_wrong_files,
+                          new_wrong_hashes, unverified_hashes):
+
+        self.write(('compare', backup_name, signature, position, new_missing_files, new_wrong_files, new_wrong_hashes,
+                    unverified_hashes))
+
+    def record_clips(self, backup_name, signature, missing_delivery, ale_clips_checked):
+
+        self.write(('clips', backup_name, signature, missing_delivery, ale_clips_checked))
+
+    def write(self, record):
+
+        pickle.dump(record, self.file_handler, protocol=pickle.HIGHEST_PROTOCOL)
+        self.file_handler.flush()
+        os.fsync(self.file_handler.fileno())
+
+        self.last_save = time.monotonic()
+
+    def remove(self):
+
+        """delete the checkpoint once the check has completed"""
+
+        self.file_handler.close()
+
+        if os.path.exists(self.file_path):
+            os.remove(self.file_path)
+
+
+class ReportWriter:
+
+    """
+    Stream the report, and a csv file of every failed entry, to hidden files in the day folder as the check runs,
+    so neither is held in memory. They are renamed once the check's result is known
+    """
+
+    report_file_name = '.mhl_crosscheck_report'
+    results_file_name = '.mhl_crosscheck_results'
+
+    results_header = ['Backup', 'Check', 'Path', 'Source size', 'Backup size', 'Found at']
+
+    def __init__(self, root_folder):
+
+        self.report_path = os.path.join(root_folder, self.report_file_name)
+        self.results_path = os.path.join(root_folder, self.results_file_name)
+
+        self.report_file = open(self.report_path, 'w', encoding='utf-8')
+        self.results_file = open(self.results_path, 'w', encoding='utf-8', newline='')
+
+        self.results = csv.writer(self.results_file)
+        self.results.writerow(self.results_header)
+
+        self.first_line = True
+
+    def write_line(self, message):
+
+        if not self.first_line:
+            self.report_file.write('\n')
+
+        self.report_file.write(message)
+        self.first_line = False
+
+    def add_result(self, backup_name, check, path, source_size='', backup_size='', found_at=''):
+
+        self.results.writerow([backup_name, check, path, source_size, backup_size, found_at])
+
+    def close(self):
+
+        self.report_file.close()
+        self.results_file.close()
+
+    def finish(self, file_path):
+
+        """close both files, and rename them to file_path with .txt and .csv extensions"""
+
+        self.close()
+
+        os.replace(self.report_path, file_path + '.txt')
+        os.replace(self.results_path, file_path + '.csv')
+
+    def discard(self):
+
+        """close and delete both files, if the check didn't finish"""
+
+        self.close()
+
+        for file_path in (self.report_path, self.results_path):
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+
+class QuickCheckResult:
+
+    """the result of checking one backup against a random sample of the source entries"""
+
+    def __init__(self, name, sample_size, total, missing_files, wrong_files):
+
+        self.name = name
+        self.sample_size = sample_size
+        self.total = total
+        self.missing_files = missing_files
+        self.wrong_files = wrong_files
+
+    def failures(self):
+
+        return len(self.missing_files) + len(self.wrong_files)
+
+    def is_exact(self):
+
+        return self.sample_size >= self.total
+
+    def estimate(self, z=1.96):
+
+        """return the estimated number of failed entries in the whole backup, and the Wilson score interval around it"""
+
+        if self.is_exact() or not self.sample_size:
+            return self.failures(), self.failures(), self.failures()
+
+        n = self.sample_size
+        p = self.failures() / n
+
+        centre = (p + z * z / (2 * n)) / (1 + z * z / n)
+        spread = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+
+        return p * self.total, max(0.0, centre - spread) * self.total, min(1.0, centre + spread) * self.total
+
+
+class FingerprintFilter:
+
+    """
+    A static filter of 64 bit fingerprints, sorted in place in an array so it takes 8 bytes per entry. With 64 bit
+    fingerprints a false match is vanishingly unlikely, even with hundreds of millions of entries
+    """
+
+    def __init__(self, fingerprints):
+
+        self.fingerprints = numpy.frombuffer(fingerprints, dtype=numpy.uint64) if len(fingerprints) else \
+            numpy.zeros(0, dtype=numpy.uint64)
+        self.fingerprints.sort()
+
+    def contains(self, fingerprints):
+
+        """return a boolean array of which fingerprints are in the filter"""
+
+        if not len(self.fingerprints):
+            return numpy.zeros(len(fingerprints), dtype=bool)
+
+        positions = numpy.searchsorted(self.fingerprints, fingerprints)
+        positions[positions == len(self.fingerprints)] = 0
+
+        return self.fingerprints[positions] == fingerprints
+
+    def __len__(self):
+
+        return len(self.fingerprints)
+
+
+def fingerprint(entry):
+
+    """return a 64 bit fingerprint of a file and file size"""
+
+    return hash(entry) & 0xFFFFFFFFFFFFFFFF
+
+
+def hash_columns(dictionary):
+
+    """return 64 bit hashes of a dictionary's keys, and of its keys and values, as two arrays in dictionary order"""
+
+    key_hashes = numpy.fromiter(map(hash, dictionary), dtype=numpy.int64, count=len(dictionary)).view(numpy.uint64)
+    value_hashes = numpy.fromiter(map(hash, dictionary.values()), dtype=numpy.int64,
+                                  count=len(dictionary)).view(numpy.uint64)
+
+    # multiplying by an odd constant is reversible, so entries with the same key only collide if their values do
+    entry_hashes = key_hashes * numpy.uint64(0x9E3779B97F4A7C15) ^ value_hashes
+
+    return key_hashes, entry_hashes
+
+
+def mhl_signatures(mhl_list):
+
+    """return the path, size and modification time of each mhl, to tell if saved results still apply"""
+
+    signatures = []
+
+    for mhl in mhl_list:
+        stat = os.stat(mhl)
+        signatures.append((mhl, stat.st_size, stat.st_mtime_ns))
+
+    return tuple(signatures)
+
+
+class FolderWatcher:
+
+    """poll a day folder's verifier and source folders, and re-run the checks once new or changed mhls settle"""
+
+    watched_extensions = MHL_EXTENSIONS + (".ale", ".ALE", mhl_v2.CHAIN_FILE_NAME)
+
+    def __init__(self, root_folder, preset_name, preset_dict, manager=None, interval=5.0, debounce=10.0,
+                 before_check=None, on_progress=None):
+
+        self.root_folder = root_folder
+        self.preset_name = preset_name
+        self.preset_dict = preset_dict
+        self.manager = manager
+
+        self.interval = interval
+        self.debounce = debounce
+
+        self.mhl_cache = MhlCache()
+
+        self.checked_snapshot = None
+        self.pending_snapshot = None
+        self.last_change = 0.0
+
+        self.last_checker = None
+        self.before_check = before_check
+        self.on_progress = on_progress
+
+    def snapshot(self):
+
+        """list the day folder, returning the inventory and the size and modification time of every mhl and ale"""
+
+        source_folders = [x for x in self.preset_dict[self.preset_name][4] if x]
+        inventory = Inventory(self.root_folder, source_folders)
+
+        return inventory, dict(inventory.stats)
+
+    def poll(self):
+
+        """take a snapshot, and run the checks if the folder has changed and then been quiet for the debounce time.
+        Return the checker if the checks were run, otherwise None"""
+
+        now = time.monotonic()
+        inventory, current = self.snapshot()
+
+        if current != self.pending_snapshot:
 
-            self.report_check_list(self.missing_files, "Missing source indexes")
-            self.report_check_list(self.wrong_files, "Incorrect source indexes")
-            self.report_check_list(self.missing_delivery, "Missing ALE clips")
+            # the first snapshot is checked straight away, later changes wait until the copy has settled
+            if self.pending_snapshot is not None:
+                self.log(f"Change detected in {os.path.basename(self.root_folder)}, waiting for it to settle", 1)
+                self.last_change = now
 
-        def report_check_list(self, check_list, check_list_name):
+            self.pending_snapshot = current
 
-            """use the parent checker's logger to report a specified check's results"""
+        if current == self.checked_snapshot or now - self.last_change < self.debounce:
+            return None
+
+        self.checked_snapshot = current
+        self.mhl_cache.discard_missing()
 
-            if len(check_list):
-                self.parent.logger.error(check_list_name, report=True)
-                cutoff_count = 5
-                cutoff = False
-                for index, value in enumerate(check_list):
+        if self.before_check:
+            self.before_check()
 
-                    self.parent.logger.error(f'\t{value}', report=True, supress_log=cutoff)
+        try:
+            self.last_checker = make_checker_from_preset(self.root_folder, self.preset_name, self.preset_dict,
+                                                         manager=self.manager, mhl_cache=self.mhl_cache,
+                                                         on_progress=self.on_progress, inventory=inventory)
 
-                    if index >= cutoff_count + 1:
-                        cutoff = True
-                if cutoff:
-                    self.parent.logger.error(f'\t...and {len(check_list) - cutoff_count} more')
+        except BackupCheckerException as error:
+            self.log(f"Waiting for MHLs - {error}", 3)
+            return None
 
-                return False
+        return self.last_checker
 
-            else:
-                self.parent.logger.passed(f'{check_list_name} - None', report=True)
-                return True
+    def run(self, on_check=None):
 
+        """poll until interrupted, calling on_check with each new checker"""
 
-class BackupCheckerException(Exception):
+        self.log(f"Watching {self.root_folder} - press Ctrl+C to stop", 1)
 
-    def __init__(self, message="Verifier error"):
-        super().__init__(message)
+        try:
+            while True:
+                checker = self.poll()
 
+                if checker and on_check:
+                    on_check(checker)
 
-def mhl_to_dict(mhl_file_path: str, add_parent_folders=0, trim_top_levels=0, root_pattern=r''):
-    """load a mhl file and return a dictionary of files and file sizes with normalised file paths"""
+                time.sleep(self.interval)
 
-    dict_of_files_and_sizes = {}
+        except KeyboardInterrupt:
+            self.log("Stopped watching", 1)
 
-    with open(mhl_file_path, "r") as file_handler:
-        contents = file_handler.readlines()
+    def log(self, message, alert_level):
 
-    for index, line in enumerate(contents):
+        if self.manager:
+            self.manager.log(message, alert_level)
+        else:
+            print(message)
+
+
+def mhl_to_dict(mhl_file_path: str, add_parent_folders=0, trim_top_levels=0, root_pattern=r'', progress=None,
+                lines=None, hashes=False, normalise_keys=False):
+    """load a mhl file and return a dictionary of files and file sizes with normalised file paths.
+    If given, progress is called with the characters read and entries found so far, and the file's lines are taken
+    from lines instead of opening the file. If hashes is set, each entry's hash is kept in the dictionary's digests.
+    If normalise_keys is set, keys are NFC normalised and case folded, and the dictionary's originals map any changed
+    key back to the path written in the mhl. ASC MHL v2 manifests and ascmhl folders are read the same way"""
+
+    if lines is None and is_ascmhl(mhl_file_path):
+        return ascmhl_to_dict(mhl_file_path, add_parent_folders, trim_top_levels, root_pattern, progress, hashes,
+                              normalise_keys)
+
+    if lines is None:
+        with open_mhl(mhl_file_path) as file_handler:
+            return mhl_to_dict(mhl_file_path, add_parent_folders, trim_top_levels, root_pattern, progress,
+                               lines=file_handler, hashes=hashes, normalise_keys=normalise_keys)
+
+    dict_of_files_and_sizes = MhlDictionary(digests=DigestStore() if hashes else None,
+                                            originals={} if normalise_keys else None)
+
+    characters_read = 0
+    file_path = None
+    hash_entry = None
+
+    for line in lines:
 
+        characters_read += len(line)
         line = line.strip()
 
-        if line.startswith('<hashlist'):
+        # the size is on the line after the file
+        if file_path is not None:
+
+            file_size = remove_xml_tag(line, "size")
+
+            file_path = mhl_entry_path(file_path, mhl_file_path, add_parent_folders, trim_top_levels, root_pattern)
+
+            if normalise_keys:
+                original_path = file_path
+                file_path = normalise_key(file_path)
+
+                if file_path != original_path:
+                    dict_of_files_and_sizes.originals[file_path] = original_path
+
+            # add this file to the dictionary
+            dict_of_files_and_sizes[file_path] = file_size
 
-            ls = line.split()
+            if hashes:
+                hash_entry = file_path
 
-            mhl_version = ls[1].replace('version=', '').replace(">", "")
+            file_path = None
 
-            if mhl_version != '\"1.1\"':
-                raise BackupCheckerException(f'This MHL revision ({mhl_version}) is not supported')
+        # keep the first hash listed for the current file
+        elif hash_entry is not None:
+
+            hash_match = re.match(r'<(\w+)>([^<]*)</\1>', line)
+
+            if hash_match and hash_match.group(1) in DigestStore.hash_widths:
+                dict_of_files_and_sizes.digests.add(hash_entry, hash_match.group(1), hash_match.group(2))
+                hash_entry = None
+
+            elif line == '</hash>':
+                hash_entry = None
+
+            if progress and len(dict_of_files_and_sizes) % 4096 == 0:
+                progress(characters_read, len(dict_of_files_and_sizes))
+
+        if line.startswith('<hashlist'):
+            check_mhl_version(line)
 
         if line.startswith("<file>"):
 
-            # remove the tags from the lines and save them to variables
+            # remove the tags from the line and keep it until the size line is read
             file_path = remove_xml_tag(line, "file")
-            file_size = remove_xml_tag(contents[index + 1], "size")
 
-            split_file_path = [s for s in os.path.normpath(file_path).split(os.path.sep) if s]
+    if progress:
+        progress(characters_read, len(dict_of_files_and_sizes))
 
-            # add parent folders from the MHL's path
-            if add_parent_folders:
-                split_mhl_file_path = os.path.normpath(os.path.dirname(mhl_file_path)).split(os.path.sep)
-                split_file_path = split_mhl_file_path[-add_parent_folders:] + split_file_path
+    return dict_of_files_and_sizes
 
-            # trim off n levels of the top of the path
-            else:
 
-                split_file_path = trim_paths(split_file_path, root_pattern=root_pattern,
-                                             trim_top_levels=trim_top_levels)
+def mhl_entries(mhl_file_path: str, add_parent_folders=0, trim_top_levels=0, root_pattern=r'', lines=None,
+                normalise_keys=False):
+    """yield the normalised path, size and path as written of each entry in a mhl file, without building a
+    dictionary. Paths are normalised as in mhl_to_dict"""
 
-            file_path = os.path.sep + os.path.join(*split_file_path)
+    if lines is None and is_ascmhl(mhl_file_path):
+        for key, file_size, original_path, _, _ in ascmhl_entries(mhl_file_path, add_parent_folders, trim_top_levels,
+                                                                  root_pattern, normalise_keys=normalise_keys):
+            yield key, file_size, original_path
+        return
 
-            # add this file to the dictionary
-            dict_of_files_and_sizes[file_path] = file_size
+    if lines is None:
+        with open_mhl(mhl_file_path) as file_handler:
+            yield from mhl_entries(mhl_file_path, add_parent_folders, trim_top_levels, root_pattern,
+                                   lines=file_handler, normalise_keys=normalise_keys)
+        return
+
+    file_path = None
+
+    for line in lines:
+
+        line = line.strip()
+
+        # the size is on the line after the file
+        if file_path is not None:
+
+            original_path = mhl_entry_path(file_path, mhl_file_path, add_parent_folders, trim_top_levels,
+                                           root_pattern)
+
+            yield (normalise_key(original_path) if normalise_keys else original_path,
+                   remove_xml_tag(line, "size"), original_path)
+
+            file_path = None
+
+        if line.startswith('<hashlist'):
+            check_mhl_version(line)
+
+        if line.startswith("<file>"):
+            file_path = remove_xml_tag(line, "file")
+
+
+def ascmhl_to_dict(mhl_file_path, add_parent_folders=0, trim_top_levels=0, root_pattern=r'', progress=None,
+                   hashes=False, normalise_keys=False):
+    """load an ascmhl folder or ASC MHL v2 manifest as mhl_to_dict does, keeping the latest generation of each
+    file"""
+
+    dict_of_files_and_sizes = MhlDictionary(digests=DigestStore() if hashes else None,
+                                            originals={} if normalise_keys else None)
+
+    for key, file_size, original_path, hash_kind, hash_value in ascmhl_entries(
+            mhl_file_path, add_parent_folders, trim_top_levels, root_pattern, progress, normalise_keys):
+
+        dict_of_files_and_sizes[key] = file_size
+
+        if normalise_keys and key != original_path:
+            dict_of_files_and_sizes.originals[key] = original_path
+
+        if hashes and hash_kind in DigestStore.hash_widths:
+            dict_of_files_and_sizes.digests.add(key, hash_kind, hash_value)
 
     return dict_of_files_and_sizes
 
 
+def ascmhl_entries(mhl_file_path, add_parent_folders=0, trim_top_levels=0, root_pattern=r'', progress=None,
+                   normalise_keys=False):
+    """yield the normalised path, size, path as written, hash type and hash of each file in an ascmhl folder or
+    ASC MHL v2 manifest"""
+
+    anchor = mhl_anchor(mhl_file_path)
+
+    for file_path, file_size, hash_kind, hash_value in mhl_v2.ascmhl_records(mhl_file_path, progress,
+                                                                             opener=open_mhl):
+
+        original_path = mhl_entry_path(file_path, anchor, add_parent_folders, trim_top_levels, root_pattern)
+
+        yield (normalise_key(original_path) if normalise_keys else original_path, file_size, original_path,
+               hash_kind, hash_value)
+
+
+def is_ascmhl(mhl_file_path):
+    """return True for an ascmhl folder, or a mhl which is an ASC MHL v2 manifest"""
+
+    if os.path.isdir(mhl_file_path):
+        return mhl_v2.is_ascmhl_folder(mhl_file_path)
+
+    with open_mhl(mhl_file_path, 'rb') as file_handler:
+        return mhl_v2.is_manifest(file_handler.read(4096))
+
+
+def mhl_anchor(mhl_file_path):
+    """return a path whose folder is the folder a mhl's paths are relative to. Manifests in an ascmhl folder are
+    relative to the folder holding the ascmhl folder, like the folder itself"""
+
+    folder = os.path.dirname(mhl_file_path)
+
+    if os.path.basename(folder) == mhl_v2.FOLDER_NAME:
+        return folder
+
+    return mhl_file_path
+
+
+def mhl_entry_path(file_path, mhl_file_path, add_parent_folders=0, trim_top_levels=0, root_pattern=r''):
+    """return a mhl entry's path, with its mhl's parent folders added for sources, or its top levels trimmed for
+    backups"""
+
+    split_file_path = [s for s in os.path.normpath(file_path).split(os.path.sep) if s]
+
+    # add parent folders from the MHL's path
+    if add_parent_folders:
+        split_mhl_file_path = os.path.normpath(os.path.dirname(mhl_file_path)).split(os.path.sep)
+        split_file_path = split_mhl_file_path[-add_parent_folders:] + split_file_path
+
+    # trim off n levels of the top of the path
+    else:
+
+        split_file_path = trim_paths(split_file_path, root_pattern=root_pattern,
+                                     trim_top_levels=trim_top_levels)
+
+    return os.path.sep + os.path.join(*split_file_path)
+
+
+def check_mhl_version(line):
+    """raise an exception if a mhl's hashlist line is not a supported version"""
+
+    ls = line.split()
+
+    mhl_version = ls[1].replace('version=', '').replace(">", "")
+
+    if mhl_version != '\"1.1\"':
+        raise BackupCheckerException(f'This MHL revision ({mhl_version}) is not supported')
+
+
+class MhlDictionary(dict):
+
+    """a dictionary of files and file sizes, which can also carry the files' hashes and their original paths"""
+
+    def __init__(self, *args, digests=None, originals=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.digests = digests
+        self.originals = originals
+
+
+class DigestStore:
+
+    """
+    The hash of each mhl entry, stored as fixed-width bytes packed into one bytearray per hash type rather than as hex
+    strings. Each key maps to a single int holding its slot in the array and its hash type
+    """
+
+    hash_widths = {'md5': 16, 'sha1': 20, 'xxhash': 4, 'xxhash64': 8, 'xxhash64be': 8, 'xxh3': 8, 'xxh128': 16}
+
+    def __init__(self):
+
+        self.kinds = []
+        self.packed = []
+        self.slots = {}
+
+    def __len__(self):
+
+        return len(self.slots)
+
+    def add(self, key, kind, digest_text):
+
+        """add a hash from its mhl text, which is hex for most hash types and decimal for some xxhash types"""
+
+        digest = digest_to_bytes(digest_text, self.hash_widths[kind])
+
+        if digest is not None:
+            self.add_bytes(key, kind, digest)
+
+    def add_bytes(self, key, kind, digest):
+
+        if kind not in self.kinds:
+
+            if len(self.kinds) == 16:
+                return
+
+            self.kinds.append(kind)
+            self.packed.append(bytearray())
+
+        kind_id = self.kinds.index(kind)
+        packed = self.packed[kind_id]
+
+        self.slots[key] = (len(packed) // len(digest)) << 4 | kind_id
+        packed += digest
+
+    def get(self, key):
+
+        """return the (hash type, digest bytes) of a key, or None if it has no hash"""
+
+        slot = self.slots.get(key)
+
+        if slot is None:
+            return None
+
+        kind = self.kinds[slot & 15]
+        width = self.hash_widths[kind]
+        offset = (slot >> 4) * width
+
+        return kind, bytes(self.packed[slot & 15][offset:offset + width])
+
+    def update(self, other):
+
+        for key in other.slots:
+            self.add_bytes(key, *other.get(key))
+
+
+def digest_to_bytes(digest_text, width):
+
+    """convert a hex or decimal hash string to fixed-width bytes, returning None if it can't be read"""
+
+    digest_text = digest_text.strip()
+
+    try:
+        if len(digest_text) == width * 2:
+            return bytes.fromhex(digest_text)
+
+        if digest_text.isdigit():
+            return int(digest_text).to_bytes(width, 'big')
+
+    except (ValueError, OverflowError):
+        pass
+
+    return None
+
+
+def normalise_key(path):
+
+    """return a path in a canonical form, so the same file written by different filesystems gives the same key"""
+
+    return unicodedata.normalize('NFC', path).casefold()
+
+
+def mhl_display_name(mhl_file_path):
+
+    """return a mhl's file name without its extension (and any compression extension), as used for tape and drive
+    names"""
+
+    name = os.path.basename(mhl_file_path)
+
+    # an ascmhl folder is named after the folder it describes
+    if name == mhl_v2.FOLDER_NAME:
+        return os.path.basename(os.path.dirname(mhl_file_path))
+
+    for extension in reversed(MHL_EXTENSIONS):
+        if name.lower().endswith(extension):
+            return name[:-len(extension)]
+
+    return name
+
+
+def open_mhl(mhl_file_path, mode='r'):
+    """open a mhl as text, or as bytes with mode 'rb', decompressing it as it's read if it's compressed"""
+
+    opener = COMPRESSED_OPENERS.get(os.path.splitext(mhl_file_path)[1])
+
+    if opener is None:
+        return open(mhl_file_path, mode)
+
+    return opener(mhl_file_path, 'rt' if mode == 'r' else mode)
+
+
+def mhl_progress_scale(mhl_file_path, file_size):
+    """
+    Return the ratio of a mhl's size on disk to its text size, so progress through the text can be shown as bytes of
+    the file. gzip files record their text size (modulo 4GB) in their last four bytes, other compressed files are
+    assumed to be a tenth of their text size
+    """
+
+    extension = os.path.splitext(mhl_file_path)[1]
+
+    if extension not in COMPRESSED_OPENERS:
+        return 1.0
+
+    if extension == '.gz' and file_size >= 4:
+        try:
+            with open(mhl_file_path, 'rb') as file_handler:
+                file_handler.seek(-4, os.SEEK_END)
+                text_size = int.from_bytes(file_handler.read(4), 'little')
+
+            if text_size > file_size:
+                return file_size / text_size
+
+        except OSError:
+            pass
+
+    return 0.1
+
+
+def ale_entry_name(clip):
+    """return the file name of an ale clip, using the last frame's name for an image sequence"""
+
+    frame_range_match = re.search(r'\[(\d+)-(\d+)]', clip)
+
+    if frame_range_match:
+
+        frame_number = frame_range_match.group(2)
+
+        return re.sub(r'\[\d+-\d+]', frame_number, clip)
+
+    return clip
+
+
 def trim_paths(path_element_list, root_name='', root_pattern='', trim_top_levels=0):
     """normalise a list of file path elements and return it as a list of elements"""
 
@@ -575,12 +2526,13 @@ def load_presets(file_path):
         reader = csv.reader(file_handler)
         next(reader)
 
-        dictionary = {row[0]: [row[1], int(row[2]), int(row[3]), int(row[4]), row[5:8], int(row[9])] for row in reader}
+        dictionary = {row[0]: [row[1], int(row[2]), int(row[3]), int(row[4]), row[5:8], int(row[9]),
+                               row[10] if len(row) > 10 else ''] for row in reader}
 
     return dictionary
 
 
-def make_checker_from_preset(root_folder, preset_name, preset_dict, manager=None):
+def make_checker_from_preset(root_folder, preset_name, preset_dict, manager=None, **checker_options):
     preset_list = preset_dict[preset_name]
 
     my_verifier = BackupChecker(root_folder,
@@ -590,7 +2542,9 @@ def make_checker_from_preset(root_folder, preset_name, preset_dict, manager=None
                                 add_roll_folder=preset_list[3],
                                 source_folders=[x for x in preset_list[4] if x],
                                 require_ale=bool(int(preset_list[5])),
-                                manager=manager)
+                                ignore_file=preset_list[6] if len(preset_list) > 6 else '',
+                                manager=manager,
+                                **checker_options)
 
     return my_verifier
 
@@ -604,14 +2558,28 @@ class Logger:
     # 3 - Warning
     # 4 - Fail
 
-    def __init__(self, manager=None):
+    def __init__(self, manager=None, on_progress=None, progress_interval=0.25):
 
         self.alert_level = 1
 
+        # report lines are streamed to the report writer if there is one, and only kept in memory otherwise
         self.log_report = []
+        self.report_writer = None
 
         self.manager = manager
 
+        self.progress_subscribers = []
+
+        if on_progress:
+            self.progress_subscribers.append(on_progress)
+
+        if manager and hasattr(manager, 'progress'):
+            self.progress_subscribers.append(manager.progress)
+
+        self.progress_interval = progress_interval
+        self.progress_event = None
+        self.last_progress_emit = 0.0
+
     def log(self, message, report=False, supress_log=False):
 
         self.do_log(message, 1, PrintColours.NORMAL, report, supress_log)
@@ -633,7 +2601,10 @@ class Logger:
         self.set_alert_level(alert_level)
 
         if report:
-            self.log_report.append(message)
+            if self.report_writer:
+                self.report_writer.write_line(message)
+            else:
+                self.log_report.append(message)
 
         if not supress_log:
 
@@ -649,6 +2620,148 @@ class Logger:
         if level > self.alert_level:
             self.alert_level = level
 
+    def start_phase(self, phase, bytes_total=0, entries_total=0):
+
+        """finish the current progress phase, and start reporting a new one"""
+
+        if self.progress_event:
+            self.emit_progress(force=True)
+
+        self.progress_event = ProgressEvent(phase, bytes_total=bytes_total, entries_total=entries_total)
+        self.emit_progress(force=True)
+
+    def finish_progress(self):
+
+        """emit the final state of the current phase"""
+
+        if self.progress_event:
+            self.emit_progress(force=True)
+            self.progress_event = None
+
+    def advance(self, bytes_done=0, entries=0, current_file=None):
+
+        """add to the current phase's progress, emitting an event if the rate limit allows"""
+
+        if not self.progress_event:
+            return
+
+        self.progress_event.bytes_done += bytes_done
+        self.progress_event.entries_done += entries
+
+        if current_file is not None:
+            self.progress_event.current_file = current_file
+
+        self.emit_progress()
+
+    def file_progress(self, file_path, scale=1.0, size=None):
+
+        """return a progress callback for a parser, which reports the bytes and entries read from one file. Bytes are
+        multiplied by scale, and kept within size if given, for files whose text is larger than the file"""
+
+        last = [0, 0]
+
+        def progress(bytes_done, entries_done):
+            bytes_done = int(bytes_done * scale) if size is None else min(int(bytes_done * scale), size)
+            self.advance(bytes_done - last[0], entries_done - last[1], os.path.basename(file_path))
+            last[0], last[1] = bytes_done, entries_done
+
+        return progress
+
+    def emit_progress(self, force=False):
+
+        if not self.progress_subscribers:
+            return
+
+        now = time.monotonic()
+
+        if not force and now - self.last_progress_emit < self.progress_interval:
+            return
+
+        self.last_progress_emit = now
+
+        for subscriber in self.progress_subscribers:
+            subscriber(self.progress_event)
+
+
+class ProgressEvent:
+
+    """the progress of one phase of a check, as passed to progress subscribers"""
+
+    def __init__(self, phase, bytes_total=0, entries_total=0):
+
+        self.phase = phase
+        self.current_file = ""
+
+        self.bytes_done = 0
+        self.bytes_total = bytes_total
+        self.entries_done = 0
+        self.entries_total = entries_total
+
+        self.start_time = time.monotonic()
+
+    @property
+    def elapsed(self):
+
+        return time.monotonic() - self.start_time
+
+    @property
+    def throughput(self):
+
+        """bytes per second, or entries per second for phases that don't read files"""
+
+        done = self.bytes_done if self.bytes_total else self.entries_done
+
+        return done / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def fraction(self):
+
+        if self.bytes_total:
+            return min(self.bytes_done / self.bytes_total, 1.0)
+
+        if self.entries_total:
+            return min(self.entries_done / self.entries_total, 1.0)
+
+        return 0.0
+
+    @property
+    def eta(self):
+
+        """estimated seconds until the phase completes, or None if it can't be estimated yet"""
+
+        total, done = (self.bytes_total, self.bytes_done) if self.bytes_total else (self.entries_total,
+                                                                                     self.entries_done)
+
+        if not total or not self.throughput:
+            return None
+
+        return max(total - done, 0) / self.throughput
+
+    def as_dict(self):
+
+        return {'phase': self.phase, 'current_file': self.current_file,
+                'bytes_done': self.bytes_done, 'bytes_total': self.bytes_total,
+                'entries_done': self.entries_done, 'entries_total': self.entries_total,
+                'throughput': self.throughput, 'eta': self.eta, 'fraction': self.fraction}
+
+    def __str__(self):
+
+        return describe_progress(self.as_dict())
+
+
+def describe_progress(progress):
+
+    """return a one line description of a progress event's dictionary"""
+
+    if progress['bytes_total']:
+        rate = f"{progress['throughput'] / 1_000_000:.1f} MB/s"
+    else:
+        rate = f"{progress['throughput']:,.0f} entries/s"
+
+    eta = f"{progress['eta']:.0f}s left" if progress['eta'] is not None else "estimating"
+
+    return f"{progress['phase']} {progress['fraction']:.0%} - {progress['current_file']} - {rate} - {eta}"
+
 
 class PrintColours:
     NORMAL = ''
@@ -663,37 +2776,132 @@ class PrintColours:
     UNDERLINE = '\033[4m'
 
 
+ALERT_COLOURS = {0: PrintColours.NORMAL, 1: PrintColours.NORMAL, 2: PrintColours.OKGREEN,
+                 3: PrintColours.WARNING, 4: PrintColours.FAIL}
+
+
 def print_colour(message, print_type):
     print(print_type + message + PrintColours.ENDC)
 
 
-if __name__ == '__main__':
+def print_progress(event):
+    description = describe_progress(event) if isinstance(event, dict) else str(event)
+    print(f"\r{PrintColours.OKCYAN}{description}{PrintColours.ENDC}\033[K", end='', file=sys.stderr, flush=True)
 
-    debug = True
 
-    if debug:
+def result_name(checker):
 
-        this_preset_dict = load_presets('presets.csv')
-        # make_checker_from_preset("/Volumes/CK_SSD/Sample footage/Test backups/6_Added_file", "z_Tests", this_preset_dict)
+    """return the report result name for a finished checker"""
 
-        start = time.perf_counter()
-        make_checker_from_preset("//Volumes/CK_SSD/Sample footage/Test backups/HDE_TEST", "Tartan",
-                                 this_preset_dict)
-        end = time.perf_counter()
+    if checker.logger.alert_level >= 4 or checker.error_lock_triggered:
+        return 'FAILED'
 
-        print(f"Performance: {end-start}")
+    elif checker.logger.alert_level >= 3:
+        return 'WARNING'
 
-    else:
+    elif checker.logger.alert_level >= 2:
+        return 'PASSED'
+
+    return 'UNKNOWN'
+
+
+if __name__ == '__main__':
 
+    parser = argparse.ArgumentParser(description="Check that backup MHLs contain every source MHL entry")
+    parser.add_argument('folder', nargs='?', help="day folder to check")
+    parser.add_argument('--preset', help="job format preset from presets.csv")
+    parser.add_argument('--watch', action='store_true', help="keep re-checking the folder as new MHLs arrive")
+    parser.add_argument('--interval', type=float, default=5.0, help="seconds between folder polls in watch mode")
+    parser.add_argument('--debounce', type=float, default=10.0,
+                        help="seconds a folder must be unchanged before it is re-checked in watch mode")
+    parser.add_argument('--checkpoint', action='store_true',
+                        help="save progress to the day folder so an interrupted check can be resumed")
+    parser.add_argument('--resume', action='store_true', help="resume an interrupted check from its checkpoint")
+    parser.add_argument('--read-ahead-depth', type=int, default=4,
+                        help="number of MHL chunks to read ahead of the parser, 0 to disable")
+    parser.add_argument('--chunk-size', type=int, default=8, help="read-ahead chunk size in MB")
+    parser.add_argument('--hashes', action='store_true', help="compare file hashes as well as sizes")
+    parser.add_argument('--normalise-keys', action='store_true',
+                        help="match paths regardless of unicode normalisation and case")
+    parser.add_argument('--deep-verify', action='store_true',
+                        help="re-hash the source media on disk and check it against the source MHLs")
+    parser.add_argument('--verify-concurrency', type=int, default=8, help="files to re-hash at once")
+    parser.add_argument('--verify-per-device', type=int, default=2, help="files to re-hash at once on each device")
+    parser.add_argument('--mmap', action='store_true', help="memory map source files when re-hashing")
+    parser.add_argument('--lean', action='store_true',
+                        help="hold each backup as 8 byte fingerprints instead of a dictionary, to save memory")
+    parser.add_argument('--index', action='store_true',
+                        help="write an index file next to each backup MHL, and use it instead of parsing the MHL")
+    parser.add_argument('--processes', type=int, default=0,
+                        help="compare sources with each backup in this many processes")
+    parser.add_argument('--quick', action='store_true',
+                        help="only give a provisional result from a random sample of the source entries")
+    parser.add_argument('--quick-first', action='store_true',
+                        help="give a provisional result from a sample, then continue into the full check")
+    parser.add_argument('--sample-size', type=int, default=20000, help="source entries to sample in a quick check")
+    parser.add_argument('--server', nargs='?', const='127.0.0.1:8765',
+                        help="submit the check to a running check service (host:port)")
+    args = parser.parse_args()
+
+    this_preset_dict = load_presets('presets.csv')
+
+    folder = args.folder
+
+    if not folder:
         folder = input("Drag day folder here...")
-        folder = folder.replace("\\", "")
+        folder = folder.replace("\\", "").strip()
 
-        this_preset_dict = load_presets('presets.csv')
+    preset = args.preset
+
+    if preset not in this_preset_dict:
 
         for key in this_preset_dict.keys():
             print(key)
 
         preset = input("Type one of the above presets")
 
-        if preset in list(this_preset_dict.keys()):
-            BackupChecker(folder, backup_pattern=this_preset_dict[preset][0], backup_trim=this_preset_dict[preset][1])
+        if preset not in this_preset_dict:
+            print_colour(f"Unknown preset {preset}", PrintColours.FAIL)
+            sys.exit(1)
+
+    if args.server:
+
+        import mhl_service
+
+        host, port = args.server.rsplit(":", 1)
+        outcome = mhl_service.submit_check(os.path.abspath(folder), preset, host=host, port=int(port),
+                                           on_log=lambda message, level: print_colour(message,
+                                                                                      ALERT_COLOURS[level]),
+                                           on_progress=print_progress)
+        print(f"Checks {outcome['result']}")
+
+    elif args.watch:
+
+        watcher = FolderWatcher(folder, preset, this_preset_dict, interval=args.interval, debounce=args.debounce,
+                                on_progress=print_progress)
+        watcher.run(on_check=lambda checker: print(f"Checks {result_name(checker)}"))
+
+    else:
+
+        if args.quick or args.quick_first:
+            quick_checker = make_checker_from_preset(folder, preset, this_preset_dict, on_progress=print_progress,
+                                                     quick_check=True, quick_sample_size=args.sample_size,
+                                                     normalise_keys=args.normalise_keys)
+            print(f"Quick check {result_name(quick_checker)} (provisional)")
+
+            if args.quick:
+                sys.exit(0)
+
+        start = time.perf_counter()
+        make_checker_from_preset(folder, preset, this_preset_dict, on_progress=print_progress,
+                                 checkpoint=args.checkpoint, resume=args.resume,
+                                 read_ahead_depth=args.read_ahead_depth,
+                                 read_ahead_chunk_size=args.chunk_size * 1024 * 1024,
+                                 compare_hashes=args.hashes, deep_verify=args.deep_verify,
+                                 verify_concurrency=args.verify_concurrency,
+                                 verify_per_device=args.verify_per_device, verify_mmap=args.mmap,
+                                 normalise_keys=args.normalise_keys, lean=args.lean,
+                                 compare_processes=args.processes, use_index=args.index)
+        end = time.perf_counter()
+
+        print(f"Performance: {end-start}")
@@ -1,8 +1,10 @@
 import os
+from datetime import datetime
 import tkinter as tk
 from tkinter import ttk
 from tkinter import filedialog
 import mhl_crosscheck
+import mhl_service
 
 
 class BackupVerifierApp(tk.Tk):
@@ -16,6 +18,9 @@ class BackupVerifierApp(tk.Tk):
 
         self.last_folder = ''
 
+        self.watcher = None
+        self.watch_job = None
+
         self.setup_ui()
 
     # noinspection PyAttributeOutsideInit
@@ -51,11 +56,69 @@ class BackupVerifierApp(tk.Tk):
         self.combo_lto_preset.current(0)
         self.combo_lto_preset.grid(column=2, row=5, sticky="W")
 
+        # options
+        self.frame_options = tk.Frame(self)
+        self.frame_options.grid(column=1, row=6, columnspan=2)
+
+        # watch mode
+        self.watch_enabled = tk.BooleanVar(value=False)
+        self.check_watch = tk.Checkbutton(self.frame_options, text="Watch folder for new MHLs",
+                                          variable=self.watch_enabled, command=self.toggle_watch)
+        self.check_watch.pack(anchor="w")
+
+        # check service
+        self.service_enabled = tk.BooleanVar(value=False)
+        self.check_service = tk.Checkbutton(self.frame_options, text="Use check service",
+                                            variable=self.service_enabled)
+        self.check_service.pack(anchor="w")
+
+        # checkpoint
+        self.checkpoint_enabled = tk.BooleanVar(value=False)
+        self.check_checkpoint = tk.Checkbutton(self.frame_options, text="Save checkpoints and resume interrupted checks",
+                                               variable=self.checkpoint_enabled)
+        self.check_checkpoint.pack(anchor="w")
+
+        # hashes
+        self.hashes_enabled = tk.BooleanVar(value=False)
+        self.check_hashes = tk.Checkbutton(self.frame_options, text="Compare file hashes",
+                                           variable=self.hashes_enabled)
+        self.check_hashes.pack(anchor="w")
+
+        # key normalisation
+        self.normalise_enabled = tk.BooleanVar(value=False)
+        self.check_normalise = tk.Checkbutton(self.frame_options, text="Ignore case and unicode differences in paths",
+                                              variable=self.normalise_enabled)
+        self.check_normalise.pack(anchor="w")
+
+        # low memory comparison
+        self.lean_enabled = tk.BooleanVar(value=False)
+        self.check_lean = tk.Checkbutton(self.frame_options, text="Low memory comparison",
+                                         variable=self.lean_enabled)
+        self.check_lean.pack(anchor="w")
+
+        # quick check
+        self.quick_enabled = tk.BooleanVar(value=False)
+        self.check_quick = tk.Checkbutton(self.frame_options, text="Quick check a sample first",
+                                          variable=self.quick_enabled)
+        self.check_quick.pack(anchor="w")
+
+        # deep verify
+        self.deep_verify_enabled = tk.BooleanVar(value=False)
+        self.check_deep_verify = tk.Checkbutton(self.frame_options, text="Re-hash source media on disk",
+                                                variable=self.deep_verify_enabled)
+        self.check_deep_verify.pack(anchor="w")
+
         # info label
         self.label_info = tk.Label(self, text="Select a day folder to verify", font=('LucidaGrande.ttc', 25))
         self.label_info.grid(column=0, row=10, columnspan=4, padx=20, pady=5)
         self.text_colour = self.label_info.cget("fg")
 
+        # progress
+        self.progress_bar = ttk.Progressbar(self, orient="horizontal", mode="determinate", maximum=100)
+        self.progress_bar.grid(column=0, row=12, columnspan=4, sticky="EW", padx=10)
+        self.label_progress = tk.Label(self, text="", anchor="w")
+        self.label_progress.grid(column=0, row=13, columnspan=4, sticky="EW", padx=10)
+
         # console
         self.text_console = tk.Text(self, width=75, takefocus=0, highlightthickness=0, padx=5, pady=5,
                                     font='LucidaGrande.ttc')
@@ -77,28 +140,128 @@ class BackupVerifierApp(tk.Tk):
         self.label_info['text'] = os.path.basename(folder)
         self.update()
 
+        self.stop_watch()
+
+        if self.watch_enabled.get():
+            self.watcher = mhl_crosscheck.FolderWatcher(folder, self.combo_lto_preset.get(), self.presets,
+                                                        manager=self, before_check=self.reset_log)
+            self.poll_watcher()
+            return
+
+        if self.service_enabled.get():
+            self.load_from_service(folder)
+            return
+
+        if self.quick_enabled.get():
+            self.quick_check(folder)
+            return
+
+        self.full_check(folder)
+
+    def quick_check(self, folder):
+
+        """show a provisional result from a sample of the source entries, then continue into the full check"""
+
+        try:
+            my_verifier = mhl_crosscheck.make_checker_from_preset(folder,
+                                                                  self.combo_lto_preset.get(),
+                                                                  self.presets,
+                                                                  manager=self,
+                                                                  quick_check=True,
+                                                                  normalise_keys=self.normalise_enabled.get())
+
+        except mhl_crosscheck.BackupCheckerException as error:
+            self.log(f"Error in verifier: {error}\nEnding - checks did not complete", 4)
+            return
+
+        self.show_result(my_verifier.logger.alert_level, my_verifier.error_lock_triggered)
+        result = mhl_crosscheck.result_name(my_verifier)
+        self.label_info['text'] = f"{os.path.basename(folder)} - {result} (provisional)"
+        self.log("[Continuing into the full check]", 1)
+
+        self.after(100, lambda: self.full_check(folder))
+
+    def full_check(self, folder):
+
         try:
 
             my_verifier = mhl_crosscheck.make_checker_from_preset(folder,
                                                                   self.combo_lto_preset.get(),
                                                                   self.presets,
-                                                                  manager=self)
+                                                                  manager=self,
+                                                                  checkpoint=self.checkpoint_enabled.get(),
+                                                                  resume=self.checkpoint_enabled.get(),
+                                                                  compare_hashes=self.hashes_enabled.get(),
+                                                                  deep_verify=self.deep_verify_enabled.get(),
+                                                                  normalise_keys=self.normalise_enabled.get(),
+                                                                  lean=self.lean_enabled.get())
 
         except mhl_crosscheck.BackupCheckerException as error:
             self.log(f"Error in verifier: {error}\nEnding - checks did not complete", 4)
             return
 
-        if my_verifier.logger.alert_level >= 4 or my_verifier.error_lock_triggered:
+        self.label_info['text'] = os.path.basename(folder)
+        self.show_result(my_verifier.logger.alert_level, my_verifier.error_lock_triggered)
+
+    def load_from_service(self, folder):
+
+        """run the check on the local check service, streaming its log into the console"""
+
+        try:
+            outcome = mhl_service.submit_check(folder, self.combo_lto_preset.get(), on_log=self.log,
+                                               on_progress=self.progress)
+
+        except (OSError, mhl_crosscheck.BackupCheckerException) as error:
+            self.log(f"Check service error: {error}\nEnding - checks did not complete", 4)
+            return
+
+        if outcome['result'] == 'ERROR':
+            self.log(f"Error in verifier: {outcome['message']}\nEnding - checks did not complete", 4)
+            return
+
+        self.show_result(outcome['alert_level'], outcome['error_lock'])
+
+    def show_result(self, alert_level, error_lock_triggered):
+
+        if alert_level >= 4 or error_lock_triggered:
             self.label_info.config(fg="red")
-        elif my_verifier.logger.alert_level >= 3:
+        elif alert_level >= 3:
             self.label_info.config(fg="orange")
-        elif my_verifier.logger.alert_level >= 2:
+        elif alert_level >= 2:
             self.label_info.config(fg="green")
         else:
             self.label_info.config(fg="white")
 
         self.log("[Checks complete]", 1)
 
+    def toggle_watch(self):
+
+        if not self.watch_enabled.get():
+            self.stop_watch()
+
+    def stop_watch(self):
+
+        if self.watch_job:
+            self.after_cancel(self.watch_job)
+
+        if self.watcher:
+            self.log("[Stopped watching]", 1)
+
+        self.watch_job = None
+        self.watcher = None
+
+    def poll_watcher(self):
+
+        """poll the watched folder, re-checking it when it changes, and schedule the next poll"""
+
+        my_verifier = self.watcher.poll()
+
+        if my_verifier:
+            self.show_result(my_verifier.logger.alert_level, my_verifier.error_lock_triggered)
+            self.log(f"[Watching for changes - {datetime.now().strftime('%H:%M:%S')}]", 1)
+
+        self.watch_job = self.after(int(self.watcher.interval * 1000), self.poll_watcher)
+
     def reset_log(self):
 
         self.label_info.config(fg=self.text_colour)
@@ -107,6 +270,8 @@ class BackupVerifierApp(tk.Tk):
         print("Clearing log")
         self.console_lines = 1
         self.text_console.delete("1.0", "end")
+        self.progress_bar['value'] = 0
+        self.label_progress['text'] = ""
         self.update()
         self.text_console['state'] = 'disabled'
 
@@ -128,6 +293,17 @@ class BackupVerifierApp(tk.Tk):
 
         self.update()
 
+    def progress(self, event):
+
+        """show a progress event, either a ProgressEvent from the checker or a dictionary from the check service"""
+
+        progress = event if isinstance(event, dict) else event.as_dict()
+
+        self.progress_bar['value'] = progress['fraction'] * 100
+        self.label_progress['text'] = mhl_crosscheck.describe_progress(progress)
+
+        self.update()
+
 
 if __name__ == '__main__':
     app = BackupVerifierApp()
@@ -0,0 +1,246 @@
+import bisect
+from collections.abc import Mapping
+import hashlib
+import mmap
+import os
+import struct
+
+import numpy
+
+MAGIC = b'MHLINDEX'
+VERSION = 1
+
+# magic, version, entry count, mhl size, mhl modification time, parse options digest
+HEADER = struct.Struct('<8sIxxxxQQq16s')
+
+
+class MhlIndex(Mapping):
+
+    """
+    A read-only dictionary of files and file sizes, backed by a memory mapped index file. The file holds the sorted
+    64 bit hashes of the normalised paths, the packed sizes, and offsets into a table of the paths, so opening it only
+    reads the header, and every process checking against the same tape shares the page cache
+    """
+
+    def __init__(self, file_path):
+
+        self.file_path = file_path
+
+        with open(file_path, 'rb') as file_handler:
+            self.map = mmap.mmap(file_handler.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            magic, version, self.count, mhl_size, mhl_mtime, self.options_digest = HEADER.unpack_from(self.map)
+
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f'{file_path} is not a mhl index')
+
+            self.signature = (mhl_size, mhl_mtime)
+
+            view = memoryview(self.map)
+
+            hashes_start = HEADER.size
+            sizes_start = hashes_start + 8 * self.count
+            offsets_start = sizes_start + 8 * self.count
+            strings_start = offsets_start + 8 * (self.count + 1)
+
+            self.hashes = view[hashes_start:sizes_start].cast('Q')
+            self.sizes = view[sizes_start:offsets_start].cast('q')
+            self.offsets = view[offsets_start:strings_start].cast('Q')
+            self.strings = view[strings_start:]
+
+            if len(self.strings) != (self.offsets[self.count] if self.count else 0):
+                raise ValueError(f'{file_path} is truncated')
+
+        except (ValueError, TypeError, struct.error):
+            self.close()
+            raise
+
+    def find(self, key):
+
+        """return the position of a key in the index, or -1 if it isn't there"""
+
+        key_bytes = encode_key(key)
+        key_hash = hash_key_bytes(key_bytes)
+
+        position = bisect.bisect_left(self.hashes, key_hash)
+
+        # different paths can share a hash, so compare the paths themselves
+        while position < self.count and self.hashes[position] == key_hash:
+
+            if self.strings[self.offsets[position]:self.offsets[position + 1]] == key_bytes:
+                return position
+
+            position += 1
+
+        return -1
+
+    def key_at(self, position):
+
+        return bytes(self.strings[self.offsets[position]:self.offsets[position + 1]]).decode('utf-8', 'surrogatepass')
+
+    def __getitem__(self, key):
+
+        position = self.find(key)
+
+        if position < 0:
+            raise KeyError(key)
+
+        return str(self.sizes[position])
+
+    def __contains__(self, key):
+
+        return self.find(key) >= 0
+
+    def __iter__(self):
+
+        for position in range(self.count):
+            yield self.key_at(position)
+
+    def __len__(self):
+
+        return self.count
+
+    def items(self):
+
+        return ((self.key_at(x), str(self.sizes[x])) for x in range(self.count))
+
+    def close(self):
+
+        for view in ('hashes', 'sizes', 'offsets', 'strings'):
+            if hasattr(self, view):
+                getattr(self, view).release()
+
+        self.map.close()
+
+
+class IndexGroup(Mapping):
+
+    """several mhl indexes (or dictionaries) read as one dictionary, where later mhls win, as with dict.update"""
+
+    def __init__(self, indexes):
+
+        self.indexes = indexes
+        self.count = None
+
+    def __getitem__(self, key):
+
+        for index in reversed(self.indexes):
+
+            if key in index:
+                return index[key]
+
+        raise KeyError(key)
+
+    def __contains__(self, key):
+
+        return any(key in x for x in self.indexes)
+
+    def __iter__(self):
+
+        for position, index in enumerate(self.indexes):
+            later_indexes = self.indexes[position + 1:]
+
+            for key in index:
+                if not any(key in x for x in later_indexes):
+                    yield key
+
+    def __len__(self):
+
+        if self.count is None:
+            self.count = sum(1 for _ in self)
+
+        return self.count
+
+
+def index_path(mhl_file_path):
+
+    """return the path of a mhl's index file, a hidden file next to the mhl"""
+
+    folder, name = os.path.split(mhl_file_path)
+
+    return os.path.join(folder, f'.{name}.idx')
+
+
+def options_digest(parse_options):
+
+    return hashlib.blake2b(repr(sorted(parse_options.items())).encode(), digest_size=16).digest()
+
+
+def open_index(mhl_file_path, signature, parse_options):
+
+    """open a mhl's index, or return None if there isn't one, or it was written for another version of the mhl or
+    other parse options"""
+
+    file_path = index_path(mhl_file_path)
+
+    try:
+        index = MhlIndex(file_path)
+
+    except (OSError, ValueError, TypeError, struct.error):
+        return None
+
+    if index.signature != tuple(signature) or index.options_digest != options_digest(parse_options):
+        index.close()
+        return None
+
+    return index
+
+
+def write_index(mhl_file_path, dictionary, signature, parse_options):
+
+    """write a mhl's parsed dictionary to its index file. Raises ValueError if a size isn't a plain number, and
+    OSError if the index can't be written"""
+
+    keys = [encode_key(x) for x in dictionary]
+
+    hashes = numpy.fromiter((hash_key_bytes(x) for x in keys), dtype=numpy.uint64, count=len(keys))
+    sizes = numpy.fromiter((parse_size(x) for x in dictionary.values()), dtype=numpy.int64, count=len(keys))
+
+    order = numpy.argsort(hashes, kind='stable')
+    keys = [keys[x] for x in order]
+
+    offsets = numpy.zeros(len(keys) + 1, dtype=numpy.uint64)
+    numpy.cumsum(numpy.fromiter((len(x) for x in keys), dtype=numpy.uint64, count=len(keys)), out=offsets[1:])
+
+    file_path = index_path(mhl_file_path)
+    temporary_path = f'{file_path}.{os.getpid()}.tmp'
+
+    try:
+        with open(temporary_path, 'wb') as file_handler:
+            file_handler.write(HEADER.pack(MAGIC, VERSION, len(keys), signature[0], signature[1],
+                                           options_digest(parse_options)))
+            file_handler.write(hashes[order].tobytes())
+            file_handler.write(sizes[order].tobytes())
+            file_handler.write(offsets.tobytes())
+
+            for key in keys:
+                file_handler.write(key)
+
+        os.replace(temporary_path, file_path)
+
+    finally:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+
+def encode_key(key):
+
+    return key.encode('utf-8', 'surrogatepass')
+
+
+def hash_key_bytes(key_bytes):
+
+    """a hash of a path which is the same in every process, unlike the built in hash"""
+
+    return int.from_bytes(hashlib.blake2b(key_bytes, digest_size=8).digest(), 'little')
+
+
+def parse_size(size):
+
+    """return a size as an integer, if it round trips back to the same string"""
+
+    if not size.isdigit() or str(int(size)) != size:
+        raise ValueError(f'Size {size!r} can not be indexed')
+
+    return int(size)
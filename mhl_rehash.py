@@ -0,0 +1,217 @@
+import concurrent.futures
+import hashlib
+import mmap
+import os
+import threading
+import time
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+
+class RehashJob:
+
+    """a file on disk, and the hash its mhl says it should have"""
+
+    def __init__(self, key, file_path, kind, digest):
+
+        self.key = key
+        self.file_path = file_path
+        self.kind = kind
+        self.digest = digest
+
+
+class Rehasher:
+
+    """
+    Re-hash source files on disk with a thread pool. Each file is read sequentially in large chunks (or memory mapped),
+    and the number of files read at once from each device is limited, so a RAID is kept busy without seeking between
+    too many files
+    """
+
+    def __init__(self, io_concurrency=8, per_device=2, chunk_size=8 * 1024 * 1024, use_mmap=False):
+
+        self.io_concurrency = io_concurrency
+        self.per_device = per_device
+        self.chunk_size = chunk_size
+        self.use_mmap = use_mmap
+
+        self.device_limits = {}
+        self.lock = threading.Lock()
+
+        # volume -> [bytes read, time of first read, time of last read]
+        self.volume_stats = {}
+
+    def run(self, jobs, progress=None):
+
+        """re-hash every job, and yield (job, status, bytes read) as each finishes, with status one of 'ok',
+        'changed', 'missing' or 'unsupported'. progress is called with the bytes read by each file"""
+
+        jobs = iter(jobs)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.io_concurrency) as executor:
+
+            running = set()
+
+            while True:
+
+                # keep a bounded number of jobs queued, rather than one future per file
+                for job in jobs:
+                    running.add(executor.submit(self.rehash, job))
+
+                    if len(running) >= self.io_concurrency * 4:
+                        break
+
+                if not running:
+                    return
+
+                done, running = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+
+                for future in done:
+                    job, status, bytes_read = future.result()
+
+                    if progress:
+                        progress(bytes_read)
+
+                    yield job, status, bytes_read
+
+    def rehash(self, job):
+
+        hasher = new_hasher(job.kind)
+
+        if hasher is None:
+            return job, 'unsupported', 0
+
+        try:
+            stat = os.stat(job.file_path)
+
+        except OSError:
+            return job, 'missing', 0
+
+        start = time.perf_counter()
+
+        with self.device_limit(stat.st_dev):
+
+            try:
+                self.read_into(job.file_path, hasher)
+
+            except OSError:
+                return job, 'missing', 0
+
+        self.add_volume_stats(job.file_path, stat.st_dev, stat.st_size, start, time.perf_counter())
+
+        return job, 'ok' if digest_matches(job.kind, hasher, job.digest) else 'changed', stat.st_size
+
+    def read_into(self, file_path, hasher):
+
+        with open(file_path, 'rb', buffering=0) as file_handler:
+
+            if self.use_mmap and os.fstat(file_handler.fileno()).st_size:
+
+                with mmap.mmap(file_handler.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    view = memoryview(mapped)
+
+                    for offset in range(0, len(mapped), self.chunk_size):
+                        hasher.update(view[offset:offset + self.chunk_size])
+
+                    view.release()
+
+            else:
+                buffer = bytearray(self.chunk_size)
+                view = memoryview(buffer)
+
+                while True:
+                    size = file_handler.readinto(buffer)
+
+                    if not size:
+                        break
+
+                    hasher.update(view[:size])
+
+    def device_limit(self, device):
+
+        with self.lock:
+
+            if device not in self.device_limits:
+                self.device_limits[device] = threading.Semaphore(self.per_device)
+
+            return self.device_limits[device]
+
+    def add_volume_stats(self, file_path, device, size, start, end):
+
+        with self.lock:
+
+            volume = volume_name(file_path, device)
+
+            stats = self.volume_stats.setdefault(volume, [0, start, end])
+            stats[0] += size
+            stats[1] = min(stats[1], start)
+            stats[2] = max(stats[2], end)
+
+    def throughput(self):
+
+        """return the bytes per second read from each volume, from its first read to its last"""
+
+        return {volume: size / (last - first) if last > first else 0.0
+                for volume, (size, first, last) in self.volume_stats.items()}
+
+
+volume_names = {}
+
+
+def volume_name(file_path, device):
+
+    """return the mount point of the device a file is on"""
+
+    if device not in volume_names:
+
+        path = os.path.abspath(os.path.dirname(file_path))
+
+        while not os.path.ismount(path) and os.path.dirname(path) != path:
+            path = os.path.dirname(path)
+
+        volume_names[device] = path
+
+    return volume_names[device]
+
+
+def new_hasher(kind):
+
+    """return a hash object for a mhl hash type, or None if it isn't supported here"""
+
+    if kind == 'md5':
+        return hashlib.md5()
+
+    if kind == 'sha1':
+        return hashlib.sha1()
+
+    if xxhash is None:
+        return None
+
+    if kind == 'xxhash':
+        return xxhash.xxh32()
+
+    if kind in ('xxhash64', 'xxhash64be'):
+        return xxhash.xxh64()
+
+    if kind == 'xxh3':
+        return xxhash.xxh3_64()
+
+    if kind == 'xxh128':
+        return xxhash.xxh3_128()
+
+    return None
+
+
+def digest_matches(kind, hasher, expected):
+
+    """compare a finished hash with the mhl's digest bytes"""
+
+    if kind in ('md5', 'sha1'):
+        return hasher.digest() == expected
+
+    # xxhash values are written either as decimal or as big-endian hex, which both pack to the big-endian digest,
+    # but some tools write xxhash64 as little-endian hex
+    return hasher.digest() in (expected, expected[::-1])
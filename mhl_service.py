@@ -0,0 +1,333 @@
+import argparse
+import http.client
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import itertools
+import json
+import os
+import queue
+import threading
+
+import mhl_crosscheck
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+
+class CheckJob:
+
+    """a queued check, which collects the checker's log messages as events for clients to stream"""
+
+    def __init__(self, job_id, folder, preset_name):
+
+        self.job_id = job_id
+        self.folder = folder
+        self.preset_name = preset_name
+
+        self.state = 'queued'
+        self.events = []
+        self.condition = threading.Condition()
+
+    def log(self, message, alert_level):
+
+        """called by the checker's logger, in place of the UI"""
+
+        self.add_event({'type': 'log', 'message': message, 'alert_level': alert_level})
+
+    def progress(self, event):
+
+        """called by the checker's logger at a bounded rate, with a ProgressEvent"""
+
+        self.add_event({'type': 'progress', **event.as_dict()})
+
+    def add_event(self, event):
+
+        with self.condition:
+            self.events.append(event)
+            self.condition.notify_all()
+
+    def finish(self, state, event):
+
+        with self.condition:
+            self.state = state
+            self.events.append(event)
+            self.condition.notify_all()
+
+    def stream_events(self, timeout=30.0):
+
+        """yield every event of this job as it arrives, until the job has finished"""
+
+        sent = 0
+
+        while True:
+
+            with self.condition:
+
+                if sent == len(self.events) and self.state in ('queued', 'running'):
+                    self.condition.wait(timeout)
+
+                new_events = self.events[sent:]
+                finished = self.state not in ('queued', 'running')
+
+            for event in new_events:
+                yield event
+
+            sent += len(new_events)
+
+            if finished and sent == len(self.events):
+                return
+
+
+class CheckService:
+
+    """
+    Keep presets, the ignore list and parsed mhls warm in memory, and run check jobs from a bounded queue
+    on a fixed number of worker threads
+    """
+
+    def __init__(self, preset_file='presets.csv', workers=2, queue_size=16, cache_entries=20_000_000):
+
+        self.preset_file = preset_file
+        self.preset_signature = None
+        self.presets = {}
+
+        self.ignore_files = mhl_crosscheck.IgnoredFiles()
+        self.mhl_cache = mhl_crosscheck.MhlCache(max_entries=cache_entries)
+
+        self.jobs = {}
+        self.job_ids = itertools.count(1)
+        self.job_queue = queue.Queue(maxsize=queue_size)
+
+        self.lock = threading.Lock()
+
+        self.workers = [threading.Thread(target=self.work, daemon=True) for _ in range(workers)]
+
+        for worker in self.workers:
+            worker.start()
+
+    def get_presets(self):
+
+        """return the presets, reloading them only if the preset file has changed"""
+
+        with self.lock:
+
+            stat = os.stat(self.preset_file)
+            signature = (stat.st_size, stat.st_mtime_ns)
+
+            if signature != self.preset_signature:
+                self.presets = mhl_crosscheck.load_presets(self.preset_file)
+                self.preset_signature = signature
+
+            return self.presets
+
+    def submit(self, folder, preset_name):
+
+        """queue a check and return its job, raising queue.Full if the queue is full"""
+
+        if preset_name not in self.get_presets():
+            raise mhl_crosscheck.BackupCheckerException(f"Unknown preset {preset_name}")
+
+        with self.lock:
+            job = CheckJob(next(self.job_ids), folder, preset_name)
+
+        self.job_queue.put_nowait(job)
+
+        with self.lock:
+            self.jobs[job.job_id] = job
+            self.forget_old_jobs()
+
+        return job
+
+    def forget_old_jobs(self, keep=256):
+
+        """drop the oldest finished jobs so a long-running service doesn't keep every job's events"""
+
+        finished = [x for x in self.jobs.values() if x.state not in ('queued', 'running')]
+
+        for job in finished[:max(0, len(self.jobs) - keep)]:
+            del self.jobs[job.job_id]
+
+    def work(self):
+
+        while True:
+            job = self.job_queue.get()
+            job.state = 'running'
+
+            try:
+                checker = mhl_crosscheck.make_checker_from_preset(job.folder, job.preset_name, self.get_presets(),
+                                                                  manager=job, mhl_cache=self.mhl_cache,
+                                                                  ignore_files=self.ignore_files)
+
+            except Exception as error:
+                job.finish('error', {'type': 'result', 'result': 'ERROR', 'alert_level': 4, 'message': str(error)})
+
+            else:
+                job.finish('done', {'type': 'result',
+                                    'result': mhl_crosscheck.result_name(checker),
+                                    'alert_level': checker.logger.alert_level,
+                                    'error_lock': checker.error_lock_triggered})
+
+            finally:
+                self.job_queue.task_done()
+
+    def status(self):
+
+        with self.lock:
+            return {'queued': self.job_queue.qsize(),
+                    'jobs': len(self.jobs),
+                    'cached_mhls': len(self.mhl_cache.entries),
+                    'cached_entries': self.mhl_cache.entry_count}
+
+
+class CheckRequestHandler(BaseHTTPRequestHandler):
+
+    """
+    POST /jobs              {"folder": ..., "preset": ...} - queue a check, returns the job id
+    GET  /jobs/<id>/events  stream the job's events as json lines until it finishes
+    GET  /status            queue and cache statistics
+    """
+
+    service: CheckService = None
+
+    def do_POST(self):
+
+        if self.path != '/jobs':
+            self.send_json(404, {'error': 'Not found'})
+            return
+
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            job = self.service.submit(request['folder'], request['preset'])
+
+        except queue.Full:
+            self.send_json(503, {'error': 'Check queue is full'})
+
+        except (KeyError, ValueError, mhl_crosscheck.BackupCheckerException) as error:
+            self.send_json(400, {'error': str(error)})
+
+        else:
+            self.send_json(202, {'job': job.job_id})
+
+    def do_GET(self):
+
+        if self.path == '/status':
+            self.send_json(200, self.service.status())
+            return
+
+        path_parts = self.path.strip('/').split('/')
+
+        if len(path_parts) != 3 or path_parts[0] != 'jobs' or path_parts[2] != 'events':
+            self.send_json(404, {'error': 'Not found'})
+            return
+
+        job = self.service.jobs.get(int(path_parts[1])) if path_parts[1].isdigit() else None
+
+        if not job:
+            self.send_json(404, {'error': 'Unknown job'})
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.end_headers()
+
+        for event in job.stream_events():
+            self.wfile.write((json.dumps(event) + '\n').encode())
+            self.wfile.flush()
+
+    def send_json(self, status, body):
+
+        data = json.dumps(body).encode()
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format_string, *args):
+
+        pass
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, **service_options):
+
+    """run the check service until interrupted"""
+
+    CheckRequestHandler.service = CheckService(**service_options)
+
+    server = ThreadingHTTPServer((host, port), CheckRequestHandler)
+    server.daemon_threads = True
+
+    print(f"Check service listening on {host}:{port}")
+
+    try:
+        server.serve_forever()
+
+    except KeyboardInterrupt:
+        print("Check service stopped")
+
+    finally:
+        server.server_close()
+
+
+def submit_check(folder, preset_name, host=DEFAULT_HOST, port=DEFAULT_PORT, on_log=None, on_progress=None,
+                 on_event=None):
+
+    """
+    Submit a check to a running service and stream its events, calling on_log(message, alert_level) for each log
+    message, on_progress(progress) with each progress dictionary, and on_event(event) for every event.
+    Return the final result event
+    """
+
+    connection = http.client.HTTPConnection(host, port, timeout=60)
+
+    try:
+        connection.request('POST', '/jobs', body=json.dumps({'folder': folder, 'preset': preset_name}),
+                           headers={'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        body = json.loads(response.read())
+
+        if response.status != 202:
+            raise mhl_crosscheck.BackupCheckerException(f"Check service refused job: {body.get('error')}")
+
+        connection.request('GET', f"/jobs/{body['job']}/events")
+        response = connection.getresponse()
+
+        result = None
+
+        for line in response:
+
+            event = json.loads(line)
+
+            if on_event:
+                on_event(event)
+
+            if event['type'] == 'log' and on_log:
+                on_log(event['message'], event['alert_level'])
+
+            elif event['type'] == 'progress' and on_progress:
+                on_progress(event)
+
+            elif event['type'] == 'result':
+                result = event
+
+        if result is None:
+            raise mhl_crosscheck.BackupCheckerException("Check service closed the connection before the check ended")
+
+        return result
+
+    finally:
+        connection.close()
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Run a local MHL check service with warm caches")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--workers', type=int, default=2, help="checks to run at the same time")
+    parser.add_argument('--queue', type=int, default=16, help="maximum number of waiting checks")
+    parser.add_argument('--cache-entries', type=int, default=20_000_000,
+                        help="maximum number of mhl file entries to keep in memory")
+    args = parser.parse_args()
+
+    serve(args.host, args.port, workers=args.workers, queue_size=args.queue, cache_entries=args.cache_entries)
@@ -0,0 +1,147 @@
+import os
+import xml.etree.ElementTree as ElementTree
+
+FOLDER_NAME = 'ascmhl'
+CHAIN_FILE_NAME = 'ascmhl_chain.xml'
+
+# ASC MHL v2 hash formats, and the MHL 1.1 names used for them everywhere else
+HASH_KINDS = {'md5': 'md5', 'sha1': 'sha1', 'xxh32': 'xxhash', 'xxh64': 'xxhash64be', 'xxh3': 'xxh3',
+              'xxh128': 'xxh128'}
+
+
+def is_ascmhl_folder(path):
+
+    """return True for an ascmhl folder with a chain file"""
+
+    return os.path.basename(path) == FOLDER_NAME and os.path.isfile(os.path.join(path, CHAIN_FILE_NAME))
+
+
+def is_manifest(head):
+
+    """return True if the first bytes of a mhl are an ASC MHL v2 generation manifest"""
+
+    return b'urn:ASC:MHL:v2.0' in head
+
+
+def folder_signature(folder):
+
+    """return the total size of an ascmhl folder's manifests, and the modification time of its chain file, which is
+    rewritten whenever a generation is added"""
+
+    size = sum(x.stat().st_size for x in os.scandir(folder) if x.is_file())
+
+    return size, os.stat(os.path.join(folder, CHAIN_FILE_NAME)).st_mtime_ns
+
+
+def generation_files(folder):
+
+    """return the generation manifests of an ascmhl folder from its chain file, oldest first"""
+
+    generations = []
+
+    for _, element in ElementTree.iterparse(os.path.join(folder, CHAIN_FILE_NAME)):
+
+        if local_name(element.tag) == 'hashlist':
+            path = next((x.text for x in element if local_name(x.tag) == 'path'), None)
+
+            if path:
+                generations.append((int(element.get('sequencenr', 0)), os.path.join(folder, path.strip())))
+
+            element.clear()
+
+    if not generations:
+        return sorted(os.path.join(folder, x) for x in os.listdir(folder) if x.endswith('.mhl'))
+
+    return [path for _, path in sorted(generations)]
+
+
+def manifest_records(file_handler, progress=None, bytes_before=0):
+
+    """
+    Yield (path, size, hash kind, hash value) for each file in a generation manifest, parsing it incrementally and
+    clearing each element once it has been read, so memory doesn't grow with the manifest. The hash is the first one
+    that didn't fail verification, and is None if there isn't one in a supported format
+    """
+
+    parents = []
+    entries = 0
+
+    for event, element in ElementTree.iterparse(file_handler, events=('start', 'end')):
+
+        if event == 'start':
+            parents.append(element)
+            continue
+
+        parents.pop()
+
+        if local_name(element.tag) != 'hash':
+            continue
+
+        path = None
+        size = None
+        hash_kind = None
+        hash_value = None
+
+        for child in element:
+            name = local_name(child.tag)
+
+            if name == 'path':
+                path = (child.text or '').strip()
+                size = child.get('size')
+
+            elif hash_kind is None and name in HASH_KINDS and child.get('action') != 'failed':
+                hash_kind = HASH_KINDS[name]
+                hash_value = (child.text or '').strip()
+
+        # the hashes element holds every hash, so clear it rather than just this element
+        if parents:
+            parents[-1].clear()
+
+        if path is not None:
+            entries += 1
+            yield path, size, hash_kind, hash_value
+
+            if progress and not entries % 4096:
+                progress(bytes_before + file_handler.tell(), entries)
+
+
+def ascmhl_records(path, progress=None, opener=open):
+
+    """
+    Yield (path, size, hash kind, hash value) for every file in an ascmhl folder, resolving its chain of generations
+    to the latest record of each file, or for every file in a single generation manifest. Manifests are opened in
+    binary mode with opener
+    """
+
+    if os.path.isdir(path):
+        manifests = generation_files(path)
+    else:
+        manifests = [path]
+
+    # read the newest generation first, so the first record of each path is its latest
+    seen = set()
+    bytes_read = 0
+    entries = 0
+
+    for manifest in reversed(manifests):
+
+        with opener(manifest, 'rb') as file_handler:
+
+            for record in manifest_records(file_handler, progress, bytes_read):
+
+                if record[0] not in seen:
+                    seen.add(record[0])
+                    entries += 1
+                    yield record
+
+            bytes_read += file_handler.tell()
+
+    if progress:
+        progress(bytes_read, entries)
+
+
+def local_name(tag):
+
+    """return an xml tag without its namespace"""
+
+    return tag.rsplit('}', 1)[-1]
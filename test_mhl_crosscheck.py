@@ -1,5 +1,15 @@
+import csv
+import gzip
+import hashlib
+import lzma
+import os
+import tempfile
+import time
+import unicodedata
 import unittest
-from mhl_crosscheck import BackupChecker
+from unittest import mock
+from mhl_crosscheck import BackupChecker, Checkpoint, FolderWatcher, Inventory, MhlCache, ReadAheadReader, \
+    QuickCheckResult, ReportWriter, mhl_to_dict
 
 
 class TestBackupChecker(unittest.TestCase):
@@ -64,3 +74,420 @@ class TestBackupChecker(unittest.TestCase):
         self.assertFalse(checker.error_lock_triggered)
         self.assertEqual(checker.logger.alert_level, 2)
 
+
+
+def write_mhl(file_path, entries):
+
+    """write a minimal MHL 1.1 file listing (path, size, md5) entries"""
+
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<hashlist version="1.1">']
+
+    for entry_path, entry_size, entry_md5 in entries:
+        lines += ['  <hash>',
+                  f'    <file>{entry_path}</file>',
+                  f'    <size>{entry_size}</size>',
+                  f'    <md5>{entry_md5}</md5>',
+                  '  </hash>']
+
+    lines.append('</hashlist>')
+
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+
+    with open(file_path, 'w') as file_handler:
+        file_handler.write("\n".join(lines))
+
+
+def write_ascmhl(folder, generations):
+
+    """write an ascmhl folder with a chain file and one ASC MHL v2 manifest per generation of (path, size, md5)
+    entries"""
+
+    os.makedirs(folder, exist_ok=True)
+
+    chain = ['<?xml version="1.0" encoding="UTF-8"?>', '<ascmhldirectory xmlns="urn:ASC:MHL:DIRECTORY:v2.0">']
+
+    for sequence_number, entries in enumerate(generations, 1):
+        manifest_name = f"{os.path.basename(os.path.dirname(folder))}_{sequence_number:04d}.mhl"
+
+        lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<hashlist version="2.0" xmlns="urn:ASC:MHL:v2.0">',
+                 '  <hashes>']
+
+        for entry_path, entry_size, entry_md5 in entries:
+            lines += ['    <hash>',
+                      f'      <path size="{entry_size}">{entry_path}</path>',
+                      f'      <md5 action="original">{entry_md5}</md5>',
+                      '    </hash>']
+
+        lines += ['  </hashes>', '</hashlist>']
+
+        with open(os.path.join(folder, manifest_name), 'w') as file_handler:
+            file_handler.write("\n".join(lines))
+
+        chain += [f'  <hashlist sequencenr="{sequence_number}">', f'    <path>{manifest_name}</path>', '  </hashlist>']
+
+    chain.append('</ascmhldirectory>')
+
+    with open(os.path.join(folder, "ascmhl_chain.xml"), 'w') as file_handler:
+        file_handler.write("\n".join(chain))
+
+
+def make_day_folder(root_folder, clips=None, backups=("LTO001", "LTO002")):
+
+    """build a day folder with one camera roll, its media, and a matching backup MHL per tape"""
+
+    if clips is None:
+        clips = {"A001C001.mov": b"first clip", "A001C002.mov": b"second clip"}
+
+    roll_folder = os.path.join(root_folder, "Camera_Media", "A001R1AB")
+    os.makedirs(roll_folder, exist_ok=True)
+
+    source_entries = []
+
+    for clip_name, clip_data in clips.items():
+        with open(os.path.join(roll_folder, clip_name), 'wb') as file_handler:
+            file_handler.write(clip_data)
+        source_entries.append((clip_name, len(clip_data), hashlib.md5(clip_data).hexdigest()))
+
+    write_mhl(os.path.join(roll_folder, "A001R1AB.mhl"), source_entries)
+
+    for tape in backups:
+        write_mhl(os.path.join(root_folder, "Verifier", f"{tape}.mhl"),
+                  [(f"/Volumes/{tape}/JOB/DAY_001/Camera_Media/A001R1AB/{name}", size, md5)
+                   for name, size, md5 in source_entries])
+
+    return root_folder
+
+
+class TestSyntheticDay(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_folder = tempfile.TemporaryDirectory()
+        self.day_folder = make_day_folder(os.path.join(self.temp_folder.name, "DAY_001"))
+
+    def tearDown(self):
+        self.temp_folder.cleanup()
+
+    def test_synthetic_known_good(self):
+        checker = BackupChecker(self.day_folder, backup_trim=5, source_folders=["Camera_Media"])
+
+        self.assertFalse(checker.error_lock_triggered)
+        self.assertEqual(checker.logger.alert_level, 2)
+
+    def test_cache_reparses_only_changed_mhls(self):
+        cache = MhlCache()
+        BackupChecker(self.day_folder, backup_trim=5, source_folders=["Camera_Media"], mhl_cache=cache)
+        first_entries = dict(cache.entries)
+
+        backup_path = os.path.join(self.day_folder, "Verifier", "LTO002.mhl")
+        write_mhl(backup_path, [("/Volumes/LTO002/JOB/DAY_001/Camera_Media/A001R1AB/A001C001.mov", 10, "0")])
+        os.utime(backup_path, ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+
+        checker = BackupChecker(self.day_folder, backup_trim=5, source_folders=["Camera_Media"], mhl_cache=cache)
+
+        self.assertTrue(checker.error_lock_triggered)
+        for cache_key, cached in cache.entries.items():
+            if cache_key[0] != backup_path:
+                self.assertIs(cached, first_entries[cache_key])
+
+    def test_watcher_debounces_changes(self):
+        presets = {"Test": ["", 5, 1, 1, ["Camera_Media", "", ""], 0]}
+        watcher = FolderWatcher(self.day_folder, "Test", presets, debounce=60)
+
+        self.assertIsNotNone(watcher.poll())
+        self.assertIsNone(watcher.poll())
+
+        write_mhl(os.path.join(self.day_folder, "Verifier", "LTO003.mhl"), [])
+        self.assertIsNone(watcher.poll())
+
+        watcher.debounce = 0
+        self.assertIsNotNone(watcher.poll())
+
+    def test_cache_evicts_least_recently_used(self):
+        cache = MhlCache(max_entries=3)
+        BackupChecker(self.day_folder, backup_trim=5, source_folders=["Camera_Media"], mhl_cache=cache)
+
+        self.assertLessEqual(cache.entry_count, 3)
+        self.assertEqual(len(cache.entries), 1)
+
+    def test_progress_events_cover_each_phase(self):
+        events = []
+        BackupChecker(self.day_folder, backup_trim=5, source_folders=["Camera_Media"],
+                      on_progress=lambda event: events.append((event.phase, event.fraction)))
+
+        self.assertEqual([x for x in dict.fromkeys(x[0] for x in events)],
+                         ["Loading sources", "Loading backups", "Comparing"])
+        self.assertEqual(events[-1], ("Comparing", 1.0))
+
+    def test_resume_from_checkpoint_skips_parsing(self):
+        write_mhl(os.path.join(self.day_folder, "Verifier", "LTO002.mhl"),
+                  [("/Volumes/LTO002/JOB/DAY_001/Camera_Media/A001R1AB/A001C001.mov", 10, "0")])
+
+        with mock.patch.object(BackupChecker, 'write_report_file', side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                BackupChecker(self.day_folder, backup_trim=5, source_folders=["Camera_Media"], checkpoint=True)
+
+        checkpoint_path = os.path.join(self.day_folder, Checkpoint.file_name)
+        self.assertTrue(os.path.exists(checkpoint_path))
+
+        with mock.patch('mhl_crosscheck.mhl_to_dict', side_effect=AssertionError("MHL parsed again")):
+            resumed = BackupChecker(self.day_folder, backup_trim=5, source_folders=["Camera_Media"], resume=True)
+
+        uninterrupted = BackupChecker(self.day_folder, backup_trim=5, source_folders=["Camera_Media"])
+
+        self.assertEqual([x.missing_files for x in resumed.backups], [x.missing_files for x in uninterrupted.backups])
+        self.assertEqual(resumed.logger.log_report, uninterrupted.logger.log_report)
+        self.assertFalse(os.path.exists(checkpoint_path))
+
+    def test_inventory_matches_os_walk(self):
+        source_folder = os.path.join(self.day_folder, "Camera_Media")
+        inventory = Inventory(self.day_folder, ["Camera_Media", "Sound_Media"])
+
+        self.assertEqual(sorted((root, sorted(dirs), sorted(files)) for root, dirs, files in os.walk(source_folder)),
+                         sorted((root, sorted(dirs), sorted(files)) for root, dirs, files in
+                                inventory.walk(source_folder)))
+        self.assertFalse(inventory.is_dir(os.path.join(self.day_folder, "Sound_Media")))
+        self.assertEqual(sorted(inventory.files(os.path.join(self.day_folder, "Verifier"))),
+                         ["LTO001.mhl", "LTO002.mhl"])
+
+    def test_read_ahead_matches_direct_parse(self):
+        mhl_list = [os.path.join(self.day_folder, "Verifier", x) for x in ("LTO001.mhl", "LTO002.mhl")]
+        reader = ReadAheadReader(mhl_list, chunk_size=7, queue_depth=2)
+
+        try:
+            # the first file is skipped, as if it was already cached
+            self.assertEqual(mhl_to_dict(mhl_list[1], trim_top_levels=5, lines=reader.lines(mhl_list[1])),
+                             mhl_to_dict(mhl_list[1], trim_top_levels=5))
+        finally:
+            reader.close()
+
+    def test_hashes_catch_same_size_corruption(self):
+        write_mhl(os.path.join(self.day_folder, "Verifier", "LTO002.mhl"),
+                  [("/Volumes/LTO002/JOB/DAY_001/Camera_Media/A001R1AB/A001C001.mov", 10, "0" * 32),
+                   ("/Volumes/LTO002/JOB/DAY_001/Camera_Media/A001R1AB/A001C002.mov", 11,
+                    hashlib.md5(b"second clip").hexdigest())])
+
+        checker = BackupChecker(self.day_folder, backup_trim=5, source_folders=["Camera_Media"])
+        self.assertFalse(checker.error_lock_triggered)
+
+        checker = BackupChecker(self.day_folder, backup_trim=5, source_folders=["Camera_Media"], compare_hashes=True)
+        self.assertTrue(checker.error_lock_triggered)
+        self.assertEqual(checker.backups[1].wrong_hashes, [os.path.join(os.path.sep, "A001R1AB", "A001C001.mov")])
+        self.assertEqual(len(checker.backups[1].backup_dictionary.digests.packed[0]), 32)
+
+    def test_deep_verify_finds_changed_source_media(self):
+        checker = BackupChecker(self.day_folder, backup_trim=5, source_folders=["Camera_Media"], deep_verify=True)
+        self.assertFalse(checker.error_lock_triggered)
+
+        with open(os.path.join(self.day_folder, "Camera_Media", "A001R1AB", "A001C002.mov"), 'wb') as file_handler:
+            file_handler.write(b"second clap")
+
+        checker = BackupChecker(self.day_folder, backup_trim=5, source_folders=["Camera_Media"], deep_verify=True,
+                                verify_mmap=True)
+        self.assertTrue(checker.error_lock_triggered)
+        self.assertIn(f"\t{os.path.join(os.path.sep, 'A001R1AB', 'A001C002.mov')}", checker.logger.log_report)
+
+    def test_missing_file_found_under_another_roll(self):
+        write_mhl(os.path.join(self.day_folder, "Verifier", "LTO002.mhl"),
+                  [("/Volumes/LTO002/JOB/DAY_001/Camera_Media/A001R1AB/A001C001.mov", 10, "0" * 32),
+                   ("/Volumes/LTO002/JOB/DAY_001/Camera_Media/A002R1AB/A001C002.mov", 11, "1" * 32)])
+
+        checker = BackupChecker(self.day_folder, backup_trim=5, source_folders=["Camera_Media"])
+
+        moved_from = os.path.join(os.path.sep, "A001R1AB", "A001C002.mov")
+        moved_to = os.path.join(os.path.sep, "A002R1AB", "A001C002.mov")
+        self.assertEqual(checker.backups[1].missing_files, [moved_from])
+        self.assertIn(f"\t{moved_from} - found at {moved_to} on LTO002", checker.logger.log_report)
+
+    def test_normalised_keys_match_across_filesystems(self):
+        decomposed = unicodedata.normalize('NFD', "Scène_01.wav")
+        composed = unicodedata.normalize('NFC', "SCÈNE_01.wav")
+
+        write_mhl(os.path.join(self.day_folder, "Sound_Media", "SOUND_01", "SOUND_01.mhl"), [(decomposed, 5, "0")])
+        with open(os.path.join(self.day_folder, "Sound_Media", "SOUND_01", decomposed), 'wb') as file_handler:
+            file_handler.write(b"sound")
+        for tape in ("LTO001", "LTO002"):
+            with open(os.path.join(self.day_folder, "Verifier", f"{tape}.mhl"), 'a') as file_handler:
+                file_handler.write(f"\n<file>/Volumes/{tape}/JOB/DAY_001/Sound_Media/SOUND_01/{composed}</file>\n"
+                                   f"<size>5</size>\n")
+
+        checker = BackupChecker(self.day_folder, backup_trim=5)
+        self.assertTrue(checker.error_lock_triggered)
+
+        checker = BackupChecker(self.day_folder, backup_trim=5, normalise_keys=True)
+        self.assertFalse(checker.error_lock_triggered)
+        self.assertEqual(checker.logger.alert_level, 2)
+        self.assertIn(os.path.join(os.path.sep, "SOUND_01", decomposed), checker.source_originals.values())
+
+    def test_ignore_rules_from_day_folder(self):
+        roll_folder = os.path.join(self.day_folder, "Camera_Media", "A001R1AB")
+        write_mhl(os.path.join(roll_folder, "A001R1AB.mhl"),
+                  [("A001C001.mov", 10, hashlib.md5(b"first clip").hexdigest()),
+                   ("A001C002.mov", 11, hashlib.md5(b"second clip").hexdigest()),
+                   ("._A001C001.mov", 4, "0"), ("render.tmp", 3, "0")])
+
+        checker = BackupChecker(self.day_folder, backup_trim=5, source_folders=["Camera_Media"])
+        self.assertTrue(checker.error_lock_triggered)
+
+        with open(os.path.join(self.day_folder, "Verifier", "ignore_files.txt"), 'w') as file_handler:
+            file_handler.write("# resource forks and renders\n._*\nre:.*\\.tmp\n")
+
+        checker = BackupChecker(self.day_folder, backup_trim=5, source_folders=["Camera_Media"])
+        self.assertFalse(checker.error_lock_triggered)
+        self.assertEqual(checker.logger.alert_level, 2)
+        self.assertTrue(checker.ignore_files.matches(".DS_Store"))
+
+    def test_report_and_results_are_streamed_to_files(self):
+        write_mhl(os.path.join(self.day_folder, "Verifier", "LTO002.mhl"),
+                  [("/Volumes/LTO002/JOB/DAY_001/Camera_Media/A001R1AB/A001C001.mov", 99, "0")])
+
+        with mock.patch.object(BackupChecker, 'open_report_writer', lambda checker: ReportWriter(checker.root_folder)):
+            checker = BackupChecker(self.day_folder, backup_trim=5, source_folders=["Camera_Media"])
+
+        self.assertEqual(checker.logger.log_report, [])
+
+        report_files = sorted(x for x in os.listdir(self.day_folder) if " - checks FAILED - " in x)
+        self.assertEqual([os.path.splitext(x)[1] for x in report_files], ['.csv', '.txt'])
+        self.assertFalse(any(x.startswith('.mhl_crosscheck') for x in os.listdir(self.day_folder)))
+
+        with open(os.path.join(self.day_folder, report_files[0]), newline='') as file_handler:
+            rows = list(csv.reader(file_handler))[1:]
+
+        self.assertEqual(sorted((x[1], x[2], x[3], x[4]) for x in rows),
+                         [('missing', os.path.join(os.path.sep, 'A001R1AB', 'A001C002.mov'), '11', ''),
+                          ('wrong size', os.path.join(os.path.sep, 'A001R1AB', 'A001C001.mov'), '10', '99')])
+
+        with open(os.path.join(self.day_folder, report_files[1])) as file_handler:
+            self.assertIn("Missing source indexes", file_handler.read())
+
+    def test_quick_check_samples_sources(self):
+        checker = BackupChecker(self.day_folder, backup_trim=5, source_folders=["Camera_Media"], quick_check=True)
+        self.assertEqual(checker.logger.alert_level, 2)
+        self.assertEqual([x.sample_size for x in checker.quick_results], [2, 2])
+        self.assertFalse(hasattr(checker, 'backups'))
+
+        write_mhl(os.path.join(self.day_folder, "Verifier", "LTO002.mhl"),
+                  [("/Volumes/LTO002/JOB/DAY_001/Camera_Media/A001R1AB/A001C001.mov", 10, "0")])
+
+        checker = BackupChecker(self.day_folder, backup_trim=5, source_folders=["Camera_Media"], quick_check=True,
+                                quick_sample_size=1)
+        self.assertEqual(checker.source_entry_count, 2)
+        self.assertEqual(checker.quick_results[0].failures(), 0)
+
+        checker = BackupChecker(self.day_folder, backup_trim=5, source_folders=["Camera_Media"], quick_check=True)
+        self.assertTrue(checker.error_lock_triggered)
+        self.assertEqual(checker.quick_results[1].missing_files,
+                         [os.path.join(os.path.sep, "A001R1AB", "A001C002.mov")])
+
+        result = QuickCheckResult("LTO002", 10000, 10_000_000, [], [])
+        estimate, low, high = result.estimate()
+        self.assertEqual((estimate, low), (0, 0))
+        self.assertAlmostEqual(high, 3840, delta=10)
+
+        result = QuickCheckResult("LTO002", 10000, 10_000_000, ["/A001R1AB/A001C002.mov"] * 100, [])
+        estimate, low, high = result.estimate()
+        self.assertEqual(estimate, 100_000)
+        self.assertLess(low, estimate)
+        self.assertGreater(high, estimate)
+
+    def test_lean_mode_matches_full_comparison(self):
+        checker = BackupChecker(self.day_folder, backup_trim=5, source_folders=["Camera_Media"], lean=True)
+        self.assertFalse(checker.error_lock_triggered)
+        self.assertEqual(checker.logger.alert_level, 2)
+
+        write_mhl(os.path.join(self.day_folder, "Verifier", "LTO002.mhl"),
+                  [("/Volumes/LTO002/JOB/DAY_001/Camera_Media/A001R1AB/A001C001.mov", 99, "0")])
+
+        full = BackupChecker(self.day_folder, backup_trim=5, source_folders=["Camera_Media"])
+        lean = BackupChecker(self.day_folder, backup_trim=5, source_folders=["Camera_Media"], lean=True)
+
+        self.assertTrue(lean.error_lock_triggered)
+        for full_backup, lean_backup in zip(full.backups, lean.backups):
+            self.assertEqual(lean_backup.missing_files, full_backup.missing_files)
+            self.assertEqual(lean_backup.wrong_files, full_backup.wrong_files)
+            self.assertEqual(lean_backup.files_checked, full_backup.files_checked)
+        self.assertEqual(len(lean.backups[0].backup_filter), 2)
+        self.assertEqual(lean.backups[1].backup_dictionary,
+                         {os.path.join(os.path.sep, "A001R1AB", "A001C001.mov"): "99"})
+
+    def test_sharded_comparison_matches_serial(self):
+        write_mhl(os.path.join(self.day_folder, "Verifier", "LTO002.mhl"),
+                  [("/Volumes/LTO002/JOB/DAY_001/Camera_Media/A001R1AB/A001C001.mov", 99, "0")])
+
+        serial = BackupChecker(self.day_folder, backup_trim=5, source_folders=["Camera_Media"])
+        sharded = BackupChecker(self.day_folder, backup_trim=5, source_folders=["Camera_Media"], compare_processes=2)
+
+        self.assertTrue(sharded.error_lock_triggered)
+        self.assertIsNone(sharded.sharded_comparison)
+        for serial_backup, sharded_backup in zip(serial.backups, sharded.backups):
+            self.assertEqual(sharded_backup.missing_files, serial_backup.missing_files)
+            self.assertEqual(sharded_backup.wrong_files, serial_backup.wrong_files)
+            self.assertEqual(sharded_backup.files_checked, serial_backup.files_checked)
+
+    def test_tape_indexes_are_written_and_reused(self):
+        cache = MhlCache()
+        checker = BackupChecker(self.day_folder, backup_trim=5, source_folders=["Camera_Media"], use_index=True,
+                                mhl_cache=cache)
+        self.assertFalse(checker.error_lock_triggered)
+
+        index_path = os.path.join(self.day_folder, "Verifier", ".LTO002.mhl.idx")
+        self.assertTrue(os.path.isfile(index_path))
+
+        with mock.patch('mhl_crosscheck.mhl_to_dict', side_effect=AssertionError):
+            checker = BackupChecker(self.day_folder, backup_trim=5, source_folders=["Camera_Media"], use_index=True,
+                                    mhl_cache=cache)
+        self.assertEqual(checker.logger.alert_level, 2)
+        self.assertEqual(dict(checker.backups[1].backup_dictionary),
+                         {os.path.join(os.path.sep, "A001R1AB", "A001C001.mov"): "10",
+                          os.path.join(os.path.sep, "A001R1AB", "A001C002.mov"): "11"})
+
+        backup_path = os.path.join(self.day_folder, "Verifier", "LTO002.mhl")
+        write_mhl(backup_path, [("/Volumes/LTO002/JOB/DAY_001/Camera_Media/A001R1AB/A001C001.mov", 99, "0")])
+        os.utime(backup_path, ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+
+        checker = BackupChecker(self.day_folder, backup_trim=5, source_folders=["Camera_Media"], use_index=True)
+        self.assertTrue(checker.error_lock_triggered)
+        self.assertEqual(checker.backups[1].wrong_files, [os.path.join(os.path.sep, "A001R1AB", "A001C001.mov")])
+        self.assertEqual(checker.backups[1].missing_files, [os.path.join(os.path.sep, "A001R1AB", "A001C002.mov")])
+
+    def test_compressed_mhls_are_found_and_parsed(self):
+        for tape, opener, extension in (("LTO001", gzip.open, ".gz"), ("LTO002", lzma.open, ".xz")):
+            mhl_path = os.path.join(self.day_folder, "Verifier", f"{tape}.mhl")
+
+            with open(mhl_path, 'rb') as source, opener(mhl_path + extension, 'wb') as destination:
+                destination.write(source.read())
+            os.remove(mhl_path)
+
+        checker = BackupChecker(self.day_folder, backup_trim=5, source_folders=["Camera_Media"])
+
+        self.assertFalse(checker.error_lock_triggered)
+        self.assertEqual(checker.logger.alert_level, 2)
+        self.assertEqual([x.name for x in checker.backups], ["LTO001", "LTO002"])
+        self.assertEqual([x.files_checked for x in checker.backups], [2, 2])
+
+    def test_ascmhl_folders_are_read_by_generation(self):
+        roll_folder = os.path.join(self.day_folder, "Camera_Media", "A001R1AB")
+        os.remove(os.path.join(roll_folder, "A001R1AB.mhl"))
+
+        first_md5 = hashlib.md5(b"first clip").hexdigest()
+        second_md5 = hashlib.md5(b"second clip").hexdigest()
+
+        # the second generation re-lists the first clip, and wins over the first generation's size
+        write_ascmhl(os.path.join(roll_folder, "ascmhl"),
+                     [[("A001C001.mov", 999, first_md5), ("A001C002.mov", 11, second_md5)],
+                      [("A001C001.mov", 10, first_md5)]])
+
+        os.remove(os.path.join(self.day_folder, "Verifier", "LTO002.mhl"))
+        write_ascmhl(os.path.join(self.day_folder, "Verifier", "LTO002", "ascmhl"),
+                     [[(f"JOB/DAY_001/Camera_Media/A001R1AB/{name}", size, "0") for name, size in
+                       (("A001C001.mov", 10), ("A001C002.mov", 11))]])
+
+        checker = BackupChecker(self.day_folder, backup_pattern="^Camera_Media$", source_folders=["Camera_Media"],
+                                compare_hashes=False)
+
+        self.assertFalse(checker.error_lock_triggered)
+        self.assertEqual(checker.logger.alert_level, 2)
+        self.assertEqual(checker.source_mhls, [os.path.join(roll_folder, "ascmhl")])
+        self.assertEqual([x.name for x in checker.backups], ["LTO001", "LTO002"])
+        self.assertEqual(dict(checker.source_dictionary),
+                         {os.path.join(os.path.sep, "A001R1AB", "A001C001.mov"): "10",
+                          os.path.join(os.path.sep, "A001R1AB", "A001C002.mov"): "11"})